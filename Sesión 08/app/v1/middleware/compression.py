@@ -0,0 +1,179 @@
+import zlib
+from typing import Optional
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.negotiation import parse_quality_values
+
+# brotli y zstandard son opcionales: si no están instalados solo se negocia gzip
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+
+# Tipos de contenido que vale la pena comprimir (las imágenes o archivos ya comprimidos no)
+COMPRESSIBLE_TYPES = ("application/json", "application/msgpack", "application/x-ndjson", "application/xml",
+                      "application/javascript", "text/")
+# Streaming de eventos (SSE): cada evento debe llegar al cliente apenas se envía, así que no se comprime
+# (el compresor acumularía los eventos pequeños hasta juntar 'minimum_size' bytes)
+UNCOMPRESSED_STREAMING_TYPES = ("text/event-stream",)
+
+
+class _GzipEncoder:
+    def __init__(self, level: int):
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 31)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        # Z_SYNC_FLUSH permite que el cliente vaya descomprimiendo cada bloque de un streaming
+        return self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+class _BrotliEncoder:
+    def __init__(self, level: int):
+        self._compressor = brotli.Compressor(quality=level)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush()
+
+    def finish(self) -> bytes:
+        return self._compressor.finish()
+
+
+class _ZstdEncoder:
+    def __init__(self, level: int):
+        self._compressor = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.compress(data)
+
+    def flush(self) -> bytes:
+        return self._compressor.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self) -> bytes:
+        return self._compressor.flush()
+
+
+# Codificaciones disponibles en orden de preferencia del servidor, con su nivel de compresión.
+# Los niveles son bajos/medios: priorizan CPU sobre el último porcentaje de compresión
+ENCODERS = {"gzip": (_GzipEncoder, 6)}
+if brotli is not None:
+    ENCODERS = {"br": (_BrotliEncoder, 4), **ENCODERS}
+if zstandard is not None:
+    ENCODERS = {"zstd": (_ZstdEncoder, 3), **ENCODERS}
+
+
+# Elige la codificación según el header Accept-Encoding (respetando los valores q). Ante un empate
+# se usa el orden de preferencia de ENCODERS
+def negotiate_encoding(accept_encoding: str) -> Optional[str]:
+    weights = parse_quality_values(accept_encoding)
+    best, best_quality = None, 0.0
+    for encoding in ENCODERS:
+        quality = weights.get(encoding, weights.get("*", 0.0))
+        if quality > best_quality:
+            best, best_quality = encoding, quality
+    return best
+
+
+# Middleware ASGI que comprime las respuestas según Accept-Encoding (zstd, br o gzip):
+# - Solo comprime los tipos de COMPRESSIBLE_TYPES (salvo SSE) y los cuerpos de al menos 'minimum_size' bytes
+# - Las respuestas en streaming se comprimen bloque a bloque sin acumular el cuerpo; se hace flush
+#   hacia el cliente cada vez que se han comprimido al menos 'minimum_size' bytes
+# - Los cuerpos de 'offload_size' bytes o más se comprimen en un hilo para no bloquear el event loop
+class CompressionMiddleware:
+    def __init__(self, app: ASGIApp, minimum_size: int = 1024, offload_size: int = 256 * 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = negotiate_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+        responder = _CompressionResponder(send, encoding, self.minimum_size, self.offload_size)
+        await self.app(scope, receive, responder.send)
+
+
+class _CompressionResponder:
+    def __init__(self, send: Send, encoding: str, minimum_size: int, offload_size: int):
+        self._send = send
+        self.encoding = encoding
+        self.minimum_size = minimum_size
+        self.offload_size = offload_size
+        self.start_message: Optional[Message] = None
+        self.encoder = None
+        self.passthrough = False
+        self.unflushed = 0
+
+    async def _compress(self, data: bytes) -> bytes:
+        if len(data) >= self.offload_size:
+            return await anyio.to_thread.run_sync(self.encoder.compress, data)
+        return self.encoder.compress(data)
+
+    async def send(self, message: Message) -> None:
+        if message["type"] == "http.response.start":
+            # Esperamos el primer bloque del cuerpo para decidir si comprimir
+            self.start_message = message
+            return
+        if message["type"] != "http.response.body" or self.passthrough:
+            await self._send(message)
+            return
+
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+
+        if self.encoder is None:
+            headers = Headers(raw=self.start_message["headers"])
+            content_type = headers.get("content-type", "")
+            if ("content-encoding" in headers or not content_type.startswith(COMPRESSIBLE_TYPES)
+                    or content_type.startswith(UNCOMPRESSED_STREAMING_TYPES)
+                    or (not more_body and len(body) < self.minimum_size)):
+                self.passthrough = True
+                await self._send(self.start_message)
+                await self._send(message)
+                return
+
+            encoder_class, level = ENCODERS[self.encoding]
+            self.encoder = encoder_class(level)
+            headers = MutableHeaders(raw=self.start_message["headers"])
+            headers["Content-Encoding"] = self.encoding
+            headers.add_vary_header("Accept-Encoding")
+            if not more_body:
+                body = await self._compress(body) + self.encoder.finish()
+                headers["Content-Length"] = str(len(body))
+                await self._send(self.start_message)
+                await self._send({"type": "http.response.body", "body": body})
+                return
+            # En streaming no conocemos el tamaño final del cuerpo comprimido
+            del headers["Content-Length"]
+            await self._send(self.start_message)
+
+        body = await self._compress(body) if body else b""
+        self.unflushed += len(message.get("body", b""))
+        if not more_body:
+            body += self.encoder.finish()
+        elif self.unflushed >= self.minimum_size:
+            body += self.encoder.flush()
+            self.unflushed = 0
+        if body or not more_body:
+            await self._send({"type": "http.response.body", "body": body, "more_body": more_body})
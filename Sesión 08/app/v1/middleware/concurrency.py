@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import deque
+from typing import Dict, Iterable
+
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.metrics import REGISTRY, Counter, Gauge, route_label
+
+CONCURRENCY_REJECTED = REGISTRY.register(Counter(
+    "concurrency_rejected_total", "Peticiones rechazadas con 503 por el limitador de concurrencia", ("reason",),
+))
+
+
+# Límite de concurrencia adaptativo (AIMD) con una cola acotada:
+# - Se atienden a la vez como máximo 'limit' peticiones; las demás esperan en una cola FIFO de hasta
+#   'queue_size' peticiones y como máximo 'queue_timeout' segundos. Si la cola está llena o se agota la
+#   espera se responde 503 con Retry-After de inmediato, en lugar de acumular peticiones en el threadpool
+#   y en el pool de la BD hasta que los clientes se cansen de esperar
+# - Cada ruta tiene su latencia de referencia (promedio móvil exponencial de sus peticiones), porque las
+#   latencias normales de las rutas difieren en órdenes de magnitud (bcrypt en /token o /all_users con una
+#   tabla grande frente a una lectura por id). Una petición es lenta si tarda más que 'latency_tolerance'
+#   veces la referencia de su ruta más 'latency_slack' segundos (para ignorar variaciones mínimas en las
+#   rutas muy rápidas); una ruta naturalmente lenta no reduce el límite de las demás
+# - Si una petición es lenta el límite se reduce multiplicándolo por 'backoff' (a lo sumo una vez por
+#   cada tanda de peticiones: solo cuentan las que empezaron después de la última reducción). Si las
+#   peticiones responden a tiempo y el límite está en uso, sube en 1 por cada 'limit' peticiones
+#   completadas. Así el límite se ubica cerca de la concurrencia que el servidor atiende sin que la
+#   latencia se dispare y el throughput útil se mantiene aunque lleguen más peticiones
+# - Las rutas de 'exempt_paths' (métricas, administración, cargas largas) no se limitan ni se miden
+class AdaptiveConcurrencyMiddleware:
+    def __init__(self, app: ASGIApp, initial_limit: int = 20, min_limit: int = 1, max_limit: int = 200,
+                 latency_tolerance: float = 2.0, latency_slack: float = 0.05, backoff: float = 0.9,
+                 queue_size: int = 100, queue_timeout: float = 1.0, exempt_paths: Iterable[str] = (),
+                 baseline_weight: float = 0.05):
+        self.app = app
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_tolerance = latency_tolerance
+        self.latency_slack = latency_slack
+        self.baseline_weight = baseline_weight
+        self._baselines: Dict[str, float] = {}     # ruta -> latencia de referencia en segundos
+        self.backoff = backoff
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.exempt_paths = tuple(exempt_paths)
+        self.in_flight = 0
+        self._waiters = deque()
+        self._last_decrease = 0.0
+
+        limit = REGISTRY.register(Gauge("concurrency_limit", "Límite de concurrencia actual"))
+        limit.set_function(lambda: {(): int(self.limit)})
+        in_flight = REGISTRY.register(Gauge("concurrency_in_flight", "Peticiones en atención"))
+        in_flight.set_function(lambda: {(): self.in_flight})
+        queued = REGISTRY.register(Gauge("concurrency_queue_depth", "Peticiones esperando en la cola"))
+        queued.set_function(lambda: {(): len(self._waiters)})
+        baseline = REGISTRY.register(Gauge(
+            "concurrency_latency_baseline_seconds", "Latencia de referencia de cada ruta", ("route",),
+        ))
+        baseline.set_function(lambda: {(route,): value for route, value in list(self._baselines.items())})
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_paths):
+            await self.app(scope, receive, send)
+            return
+
+        if self.in_flight >= int(self.limit) or self._waiters:
+            reason = await self._wait_turn()
+            if reason is not None:
+                CONCURRENCY_REJECTED.inc(1, reason)
+                response = JSONResponse({"detail": "Servidor saturado, intente nuevamente"}, status_code=503,
+                                        headers={"Retry-After": "1"})
+                await response(scope, receive, send)
+                return
+        else:
+            self.in_flight += 1
+
+        start = time.monotonic()
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self._release(start, status_code, route_label(scope))
+
+    # Espera en la cola hasta que se libere un lugar; devuelve el motivo del rechazo o None si puede pasar
+    async def _wait_turn(self):
+        if len(self._waiters) >= self.queue_size:
+            return "queue_full"
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.queue_timeout)
+        except asyncio.TimeoutError:
+            if waiter.done():
+                # El lugar se asignó justo al vencer la espera: se usa
+                return None
+            self._waiters.remove(waiter)
+            return "queue_timeout"
+        except asyncio.CancelledError:
+            # El cliente se desconectó: si ya tenía un lugar asignado se libera para el siguiente
+            if waiter.done():
+                self.in_flight -= 1
+                self._wake_next()
+            else:
+                self._waiters.remove(waiter)
+            raise
+        return None
+
+    # El lugar pasa directamente al siguiente de la cola (in_flight no cambia) si el límite lo permite
+    def _wake_next(self):
+        while self._waiters and self.in_flight < int(self.limit):
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.in_flight += 1
+                waiter.set_result(None)
+
+    # Compara la latencia con la referencia de la ruta y la actualiza. La primera petición de una ruta solo
+    # fija su referencia. Todas las peticiones la actualizan (con poco peso), así la referencia sigue los
+    # cambios duraderos de la ruta (ej: la tabla creció) sin que una ráfaga lenta la mueva de inmediato
+    def _is_slow(self, route: str, latency: float) -> bool:
+        baseline = self._baselines.get(route)
+        if baseline is None:
+            self._baselines[route] = latency
+            return False
+        self._baselines[route] = baseline + self.baseline_weight * (latency - baseline)
+        return latency > baseline * self.latency_tolerance + self.latency_slack
+
+    def _release(self, start: float, status_code: int, route: str):
+        now = time.monotonic()
+        slow = self._is_slow(route, now - start)
+        if slow or status_code == 503:
+            # Decremento multiplicativo, ignorando las peticiones que empezaron antes de la última reducción
+            if start > self._last_decrease:
+                self.limit = max(self.min_limit, self.limit * self.backoff)
+                self._last_decrease = now
+        elif self.in_flight >= int(self.limit):
+            # Incremento aditivo: +1 por cada 'limit' peticiones completadas con el límite en uso
+            self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+        self.in_flight -= 1
+        self._wake_next()
@@ -0,0 +1,168 @@
+import hashlib
+import logging
+from typing import List, Tuple
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse, Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.idempotency import (
+    DONE, IdempotencyStore, match_route, record_response, response_record,
+)
+from ..utils.metrics import REGISTRY, Counter
+from ..utils.responses import renegotiate
+from .rate_limit import client_key
+
+logger = logging.getLogger("app.idempotency")
+
+IDEMPOTENCY_REQUESTS = REGISTRY.register(Counter(
+    "idempotency_requests_total", "Peticiones con Idempotency-Key por resultado", ("result",),
+))
+
+MAX_KEY_LENGTH = 255
+
+
+# Middleware ASGI de Idempotency-Key para las APIs que crean recursos (POST /new_user/, POST de productos).
+# Si el cliente reintenta tras un timeout con la misma clave, se devuelve la respuesta guardada de la
+# primera ejecución en lugar de repetir la API (bcrypt + INSERT, o un producto duplicado):
+# - La clave se guarda por cliente (client_key) junto con el hash del método, la ruta y el cuerpo
+# - Mientras la primera petición se ejecuta, un reintento recibe 409 con Retry-After
+# - La misma clave con otro cuerpo recibe 422 (es un error del cliente, no un reintento)
+# - Se guardan durante 'ttl' segundos las respuestas < 500; con un error 5xx o una excepción la clave se
+#   libera para que el reintento vuelva a ejecutar la API
+# - Si el almacén falla, la petición se ejecuta sin idempotencia (como el rate limit, no tumba la API)
+# Va dentro de CompressionMiddleware: se guarda el cuerpo sin comprimir y cada respuesta se comprime según
+# el Accept-Encoding del reintento. Del mismo modo, un cuerpo JSON o MessagePack se convierte al formato
+# que pide el Accept del reintento (la API negocia el formato en cada petición, ver NegotiatedRoute)
+class IdempotencyMiddleware:
+    def __init__(self, app: ASGIApp, routes: List[Tuple[str, str]], store: IdempotencyStore,
+                 ttl: float = 86400, lock_ttl: float = 60):
+        self.app = app
+        self.routes = routes
+        self.store = store
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(scope, receive, send)
+            return
+        if scope["type"] != "http" or not match_route(self.routes, scope["method"], scope["path"]):
+            await self.app(scope, receive, send)
+            return
+        idempotency_key = Headers(scope=scope).get("idempotency-key")
+        if idempotency_key is None:
+            await self.app(scope, receive, send)
+            return
+        if not idempotency_key or len(idempotency_key) > MAX_KEY_LENGTH:
+            response = JSONResponse({"detail": "Idempotency-Key inválida"}, status_code=400)
+            await response(scope, receive, send)
+            return
+
+        # El cuerpo se lee completo para calcular su hash y después se entrega igual a la API
+        body = b""
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            body += message.get("body", b"")
+            if not message.get("more_body", False):
+                break
+        fingerprint = hashlib.sha256(
+            b"%s %s?%s\n%s" % (scope["method"].encode(), scope["path"].encode(), scope["query_string"], body)
+        ).hexdigest()
+        key = f"{client_key(scope)}|{idempotency_key}"
+
+        try:
+            record = await self.store.begin(key, fingerprint, self.lock_ttl)
+        except Exception:
+            IDEMPOTENCY_REQUESTS.inc(1, "store_error")
+            logger.exception("Error del almacén de idempotencia")
+            await self.app(scope, self._replay_body(body, receive), send)
+            return
+
+        if record is not None:
+            await self._reject_or_replay(record, fingerprint, scope, receive, send)
+            return
+
+        IDEMPOTENCY_REQUESTS.inc(1, "executed")
+        status = None
+        headers = []
+        chunks = []
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status, headers
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                # Copia: los middlewares externos (compresión) modifican la lista al enviarla
+                headers = list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, self._replay_body(body, receive), send_wrapper)
+        except BaseException:
+            await self._discard(key)
+            raise
+        if status is None or status >= 500:
+            await self._discard(key)
+            return
+        try:
+            await self.store.complete(key, response_record(fingerprint, status, headers, b"".join(chunks)), self.ttl)
+        except Exception:
+            IDEMPOTENCY_REQUESTS.inc(1, "store_error")
+            logger.exception("Error del almacén de idempotencia")
+
+    async def _reject_or_replay(self, record: dict, fingerprint: str, scope: Scope, receive: Receive,
+                                send: Send) -> None:
+        if record["fingerprint"] != fingerprint:
+            IDEMPOTENCY_REQUESTS.inc(1, "mismatch")
+            response = JSONResponse(
+                {"detail": "La Idempotency-Key ya se usó con una petición distinta"}, status_code=422,
+            )
+        elif record["state"] != DONE:
+            IDEMPOTENCY_REQUESTS.inc(1, "in_flight")
+            response = JSONResponse(
+                {"detail": "La petición con esta Idempotency-Key aún se está procesando"}, status_code=409,
+                headers={"Retry-After": "1"},
+            )
+        else:
+            IDEMPOTENCY_REQUESTS.inc(1, "replayed")
+            status, headers, body = record_response(record)
+            headers = MutableHeaders(raw=headers + [(b"idempotent-replayed", b"true")])
+            if "content-type" in headers:
+                body, headers["content-type"] = renegotiate(body, headers["content-type"],
+                                                            Headers(scope=scope).get("accept", ""))
+            headers["content-length"] = str(len(body))
+            response = Response(body, status_code=status)
+            response.raw_headers = headers.raw
+        await response(scope, receive, send)
+
+    async def _discard(self, key: str) -> None:
+        try:
+            await self.store.discard(key)
+        except Exception:
+            logger.exception("Error del almacén de idempotencia")
+
+    @staticmethod
+    def _replay_body(body: bytes, receive: Receive) -> Receive:
+        sent = False
+
+        async def replay() -> Message:
+            nonlocal sent
+            if not sent:
+                sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        return replay
+
+    # Cierra la conexión con el almacén (Redis) cuando se detiene la app
+    async def _lifespan(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "lifespan.shutdown.complete":
+                await self.store.close()
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
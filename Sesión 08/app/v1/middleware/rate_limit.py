@@ -0,0 +1,96 @@
+import logging
+from typing import List
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils.db import token_subject
+from ..utils.metrics import REGISTRY, Counter
+from ..utils.rate_limit import RateLimitRule, RateLimitStore, match_rules, rate_limit_headers
+
+logger = logging.getLogger("app.ratelimit")
+
+RATE_LIMITED = REGISTRY.register(Counter(
+    "rate_limited_total", "Peticiones rechazadas con 429 por regla de rate limit", ("rule",),
+))
+RATE_LIMIT_ERRORS = REGISTRY.register(Counter(
+    "rate_limit_store_errors_total", "Errores del almacén de rate limit (las peticiones se dejan pasar)",
+))
+
+
+# Identifica al cliente: el usuario del token Bearer si es válido y, si no, la IP (detrás de un proxy
+# uvicorn la toma de X-Forwarded-For con --proxy-headers, como en serve.py)
+def client_key(scope: Scope) -> str:
+    authorization = Headers(scope=scope).get("authorization", "")
+    scheme, _, token = authorization.partition(" ")
+    if scheme.lower() == "bearer" and token:
+        username = token_subject(token)
+        if username:
+            return f"user:{username}"
+    client = scope.get("client")
+    return f"ip:{client[0] if client else 'unknown'}"
+
+
+# Middleware ASGI de rate limit con token buckets (ver app/v1/utils/rate_limit.py):
+# - Cada petición consume un token de cada regla que coincide con su método y ruta (en el orden de
+#   RATE_LIMITS); si alguna no tiene tokens se responde 429 con Retry-After sin llegar a la API
+# - Las respuestas llevan los headers RateLimit-* de la regla más restrictiva
+# - Si el almacén compartido (Redis) falla, la petición pasa: el rate limit no debe tumbar la API
+class RateLimitMiddleware:
+    def __init__(self, app: ASGIApp, rules: List[RateLimitRule], store: RateLimitStore):
+        self.app = app
+        self.rules = rules
+        self.store = store
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] == "lifespan":
+            await self._lifespan(scope, receive, send)
+            return
+        rules = match_rules(self.rules, scope["method"], scope["path"]) if scope["type"] == "http" else []
+        if not rules:
+            await self.app(scope, receive, send)
+            return
+
+        client = client_key(scope)
+        limiting = None
+        try:
+            for rule in rules:
+                key = rule.name if rule.scope == "route" else f"{rule.name}|{client}"
+                rule_state = await self.store.consume(key, rule.capacity, rule.rate)
+                # Se informa la regla sin tokens o, si todas permiten, la que tiene menos tokens restantes
+                if limiting is None or not rule_state[0] or rule_state[1] < limiting[1][1]:
+                    limiting = rule, rule_state
+                # Si una regla rechaza no se consumen tokens de las siguientes
+                if not rule_state[0]:
+                    break
+        except Exception:
+            RATE_LIMIT_ERRORS.inc()
+            logger.exception("Error del almacén de rate limit")
+            await self.app(scope, receive, send)
+            return
+
+        rule, state = limiting
+        headers = rate_limit_headers(rule, state)
+        if not state[0]:
+            RATE_LIMITED.inc(1, rule.name)
+            response = JSONResponse({"detail": "Demasiadas peticiones, intente más tarde"}, status_code=429)
+            response.raw_headers.extend(headers)
+            await response(scope, receive, send)
+            return
+
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                MutableHeaders(scope=message).raw.extend(headers)
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
+
+    # Cierra la conexión con el almacén (Redis) cuando se detiene la app
+    async def _lifespan(self, scope: Scope, receive: Receive, send: Send) -> None:
+        async def send_wrapper(message: Message) -> None:
+            if message["type"] == "lifespan.shutdown.complete":
+                await self.store.close()
+            await send(message)
+
+        await self.app(scope, receive, send_wrapper)
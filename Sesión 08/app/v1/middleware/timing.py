@@ -0,0 +1,67 @@
+import time
+from typing import Mapping, Optional
+
+from starlette.datastructures import MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from ..utils import memory
+from ..utils.db_stats import QueryStats, current_query_stats, record_query_stats, server_timing
+from ..utils.metrics import REQUEST_LATENCY, route_label
+
+
+# Middleware ASGI que reemplaza a los middlewares "http" add_custom_header y add_process_time_header:
+# - Agrega los headers fijos de 'headers' (ej: X-hi-name) a todas las respuestas
+# - Agrega "X-process-Time" con el tiempo hasta que la respuesta comenzó a enviarse
+# - Registra la duración total (incluyendo el envío del cuerpo) en el histograma de /metrics
+# - Cuenta las sentencias SQL, el tiempo en la BD y las filas de la petición (ver db_stats.py), los
+#   envía en el header "Server-Timing" y los registra en /metrics
+# - Con tracemalloc activo (/admin/memory/start) registra el pico de memoria de cada ruta (una
+#   petición a la vez, ver utils/memory.py)
+# A diferencia de BaseHTTPMiddleware no crea tareas ni streams adicionales ni acumula el cuerpo,
+# así que las respuestas en streaming pasan sin cambios
+class ProcessTimeMiddleware:
+    def __init__(self, app: ASGIApp, headers: Optional[Mapping[str, str]] = None):
+        self.app = app
+        self.headers = [(name.lower().encode("latin-1"), value.encode("latin-1"))
+                        for name, value in (headers or {}).items()]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.perf_counter_ns()
+        status_code = 500
+        stats = QueryStats(scope)
+        token = current_query_stats.set(stats)
+        memory_baseline = memory.request_started()
+
+        def record() -> None:
+            route = route_label(scope)
+            REQUEST_LATENCY.observe((time.perf_counter_ns() - start_time) / 1e9, scope["method"], route,
+                                    str(status_code))
+            record_query_stats(stats, scope["method"], route)
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                process_time = (time.perf_counter_ns() - start_time) / 1e9
+                headers = MutableHeaders(scope=message)
+                for name, value in self.headers:
+                    headers.raw.append((name, value))
+                headers["X-process-Time"] = str(process_time)
+                headers.append("Server-Timing", server_timing(stats, process_time))
+            elif message["type"] == "http.response.body" and not message.get("more_body", False):
+                record()
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            record()
+            raise
+        finally:
+            current_query_stats.reset(token)
+            # También si la petición se cancela: libera el muestreo de memoria para las siguientes
+            memory.request_finished(memory_baseline, scope["method"], route_label(scope))
@@ -0,0 +1,78 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query
+from fastapi.responses import PlainTextResponse
+
+from app.v1.utils.db import get_current_admin
+from app.v1.utils.executors import executor_group
+from app.v1.utils.metrics import REGISTRY
+from app.v1.utils.profiler import sample_stacks, collapsed_stacks, ProfilerBusy
+from app.v1.utils import memory, startup
+from app.v1.utils.routing import NegotiatedRoute
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+# Métricas en formato de texto de Prometheus (latencias por ruta con percentiles vía histogram_quantile)
+@router.get("/metrics", include_in_schema=False)
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
+
+
+# Cuánto tardó este proceso en estar listo: import de main, de cada router y el arranque (lifespan)
+@router.get("/admin/startup", dependencies=[Depends(get_current_admin)])
+def startup_report():
+    return startup.report()
+
+
+# API de administración que perfila el proceso durante 'seconds' segundos tomando muestras de las
+# pilas de todos los hilos. Devuelve un archivo de "collapsed stacks" para generar un flamegraph.
+# Ocupa su hilo hasta 60 s, así que corre en el grupo "admin" y no en el de lecturas
+@router.get("/admin/profile", response_class=PlainTextResponse, dependencies=[Depends(get_current_admin)])
+@executor_group("admin")
+def profile(seconds: float = Query(5, gt=0, le=60), interval_ms: float = Query(10, ge=1, le=1000)):
+    try:
+        counts = sample_stacks(seconds, interval_ms / 1000)
+    except ProfilerBusy as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    return PlainTextResponse(collapsed_stacks(counts),
+                             headers={"Content-Disposition": 'attachment; filename="profile.folded"'})
+
+
+# APIs de administración para investigar el uso de memoria con tracemalloc:
+# iniciar el rastreo, tomar instantáneas, compararlas y ver el pico de memoria por ruta
+@router.post("/admin/memory/start", dependencies=[Depends(get_current_admin)])
+def memory_start(frames: int = Query(25, ge=1, le=100)):
+    memory.start_tracing(frames)
+    return memory.status()
+
+
+@router.post("/admin/memory/stop", dependencies=[Depends(get_current_admin)])
+def memory_stop():
+    memory.stop_tracing()
+    return memory.status()
+
+
+@router.get("/admin/memory", dependencies=[Depends(get_current_admin)])
+def memory_status():
+    return memory.status()
+
+
+@router.post("/admin/memory/snapshots", dependencies=[Depends(get_current_admin)])
+def memory_snapshot(group_by: memory.GroupBy = memory.GroupBy.lineno, limit: int = Query(20, ge=1, le=500)):
+    try:
+        snapshot_id = memory.take_snapshot()
+    except memory.TracingNotStarted as exc:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=str(exc))
+    top = memory.top_allocations(memory.get_snapshot(snapshot_id), group_by.value, limit)
+    return {"id": snapshot_id, "top": top}
+
+
+# Compara la instantánea 'base' con 'target'. Solo lee instantáneas existentes: para comparar con el
+# estado actual primero se toma una con POST /admin/memory/snapshots
+@router.get("/admin/memory/diff", dependencies=[Depends(get_current_admin)])
+def memory_diff(base: int, target: int, group_by: memory.GroupBy = memory.GroupBy.lineno,
+                limit: int = Query(20, ge=1, le=500)):
+    try:
+        snapshots = memory.get_snapshot(base), memory.get_snapshot(target)
+    except KeyError as exc:
+        raise HTTPException(status_code=404, detail=f"La instantánea {exc.args[0]} no existe")
+    return {"base": base, "target": target, "diff": memory.diff_snapshots(*snapshots, group_by.value, limit)}
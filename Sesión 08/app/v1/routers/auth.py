@@ -0,0 +1,28 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.security import OAuth2PasswordRequestForm
+from sqlalchemy.orm import Session
+
+from app.v1.utils.db import get_db, authenticate_user, create_access_token
+from app.v1.schema.schemas import Token
+from app.v1.utils.routing import NegotiatedRoute
+from app.v1.utils.executors import executor_group
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+# Esta función nos ayudará a autenticar a un usuario mediante su usuario y contraseña
+@router.post("/token", response_model=Token)
+@executor_group("auth")
+def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
+    user = authenticate_user(db, form_data.username, form_data.password)
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Usuario o password incorrecto",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    access_token = create_access_token(
+        data={"sub": form_data.username}
+    )
+    return {"access_token": access_token, "token_type": "bearer"}
@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException, Request, Query
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from app.v1.utils.db import get_db, get_current_user
+from app.v1.schema.schemas import EmployeeIngestResult
+from app.v1.utils.ingest import JSONStreamParser, IngestError, ingest_batch
+from app.v1.utils.routing import NegotiatedRoute
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+# API protegida por el token que carga documentos de empleados (como employee.json) en la BD.
+# El cuerpo puede ser un arreglo JSON o NDJSON de cualquier tamaño: se lee por partes con un parser
+# incremental y se inserta en lotes de 'batch_size' empleados, sin cargar el archivo completo en memoria
+@router.post("/employees/ingest", response_model=EmployeeIngestResult, dependencies=[Depends(get_current_user)])
+async def ingest_employees(request: Request, batch_size: int = Query(1000, ge=1, le=10000),
+                           session: Session = Depends(get_db)):
+    parser = JSONStreamParser()
+    pending = []
+    inserted = batches = 0
+    try:
+        async for chunk in request.stream():
+            pending.extend(await run_in_threadpool(parser.feed, chunk))
+            while len(pending) >= batch_size:
+                batch, pending = pending[:batch_size], pending[batch_size:]
+                inserted += await run_in_threadpool(ingest_batch, session, batch, inserted)
+                batches += 1
+        pending.extend(await run_in_threadpool(parser.feed, b"", True))
+        if pending:
+            inserted += await run_in_threadpool(ingest_batch, session, pending, inserted)
+            batches += 1
+    except IngestError as exc:
+        # Los lotes anteriores ya quedaron guardados; informamos cuántos empleados se insertaron
+        raise HTTPException(status_code=422, detail={"error": str(exc), "inserted": inserted})
+    return {"inserted": inserted, "batches": batches}
@@ -0,0 +1,37 @@
+from fastapi import APIRouter, Depends, HTTPException, Query
+from typing import Optional
+from uuid import UUID
+
+from sqlalchemy.orm import Session
+from app.v1.utils.db import get_db, get_current_user, get_products_page
+from app.v1.model.model import User, Product
+from app.v1.schema.schemas import ProductCreate, ProductOut, ProductPage, ProductSort
+from app.v1.utils.routing import NegotiatedRoute
+from app.v1.utils.db_stats import query_budget
+from app.v1.utils.singleflight import forget_user_reads
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+
+@router.post("/users/{user_id}/products", response_model=ProductOut)
+def create_product_for_user(user_id:UUID, product: ProductCreate, session: Session = Depends(get_db)):
+    product = Product(**product.dict(), owner_id=user_id)
+    session.add(product)
+    session.commit()
+    session.refresh(product)
+    forget_user_reads(user_id)
+    return product
+
+
+# API protegida por el token que lista los productos de un usuario por páginas
+@router.get("/users/{user_id}/products", response_model=ProductPage,
+            dependencies=[Depends(get_current_user), Depends(query_budget(3))])
+def list_user_products(user_id: UUID, limit: int = Query(50, ge=1, le=500), cursor: Optional[str] = None,
+                       sort: ProductSort = ProductSort.id_asc, min_price: Optional[float] = None,
+                       max_price: Optional[float] = None, session: Session = Depends(get_db)):
+    items, next_cursor = get_products_page(session, user_id, limit, cursor=cursor, sort=sort,
+                                           min_price=min_price, max_price=max_price)
+    # Solo verificamos que el usuario exista cuando la página viene vacía
+    if not items and cursor is None and not session.query(User.id).filter(User.id == user_id).first():
+        raise HTTPException(status_code=404, detail=f"Usuario con id {user_id} no se encuentra en la BD")
+    return {"items": items, "next_cursor": next_cursor}
@@ -0,0 +1,107 @@
+from fastapi import APIRouter, Depends, HTTPException, status, Query, Response
+from typing import Optional, List
+from uuid import UUID
+
+from sqlalchemy.orm import Session, selectinload
+from app.v1.utils.db import get_db, get_password_hash, get_current_user, attach_products, get_user_fields, \
+    get_user_rows, get_engine, SessionLocal, get_current_user_released
+from app.v1.model.model import User
+from app.v1.schema.schemas import UserCreate, UserOut, \
+    user_out_adapter, user_out_list_adapter, user_out_projection_adapter, user_out_projection_list
+from app.v1.utils.responses import ORMJSONResponse, MSGPACK_MEDIA_TYPES, use_msgpack
+from app.v1.utils.routing import NegotiatedRoute
+from app.v1.utils.db_stats import query_budget
+from app.v1.utils.executors import executor_group, run_in_group
+from app.v1.utils.singleflight import user_reads, forget_user_reads
+
+router = APIRouter(route_class=NegotiatedRoute)
+
+# Usa el grupo de hilos "auth" porque el hash de la contraseña con bcrypt es lo más costoso de la API
+@router.post("/new_user/", response_model=UserOut)
+@executor_group("auth")
+def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
+    hashed_password = get_password_hash(user.hashed_password)
+    new_user = User(first_name=user.first_name, last_name=user.last_name, city=user.city,
+                    username=user.username, hashed_password=hashed_password)
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
+
+# API protegida por el token
+# 'products_limit' limita los productos embebidos en cada usuario (0 = no incluirlos)
+# 'fields' limita las columnas consultadas y los campos de la respuesta (ej: ?fields=id,first_name)
+@router.get("/all_users", response_model=List[UserOut],
+            dependencies=[Depends(get_current_user), Depends(query_budget(3))])
+def list_users(products_limit: Optional[int] = Query(None, ge=0), fields: Optional[tuple] = Depends(get_user_fields),
+               session: Session = Depends(get_db)):
+    if fields is not None:
+        rows = get_user_rows(session, fields, products_limit=products_limit)
+        return ORMJSONResponse(rows, adapter=user_out_projection_list(fields))
+    if products_limit is None:
+        # Cargamos los productos de todos los usuarios en una sola consulta adicional (evita N+1)
+        list_user = session.query(User).options(selectinload(User.products)).all()
+    else:
+        list_user = session.query(User).all()   # Obtenemos todos los usuarios de la tabla en la BD
+        attach_products(session, list_user, products_limit)
+    return ORMJSONResponse(list_user, adapter=user_out_list_adapter)
+
+
+# Lee el usuario con su propia sesión (el resultado se comparte entre varias peticiones) y devuelve la
+# respuesta ya codificada (JSON o MessagePack según el header Accept de quien inició la consulta)
+def _render_user(id: UUID, products_limit: Optional[int], fields: Optional[tuple]) -> Optional[bytes]:
+    with SessionLocal(bind=get_engine()) as session:
+        if fields is not None:
+            rows = get_user_rows(session, fields, user_id=id, products_limit=products_limit)
+            if not rows:
+                return None
+            return ORMJSONResponse(rows[0], adapter=user_out_projection_adapter(fields)).body
+        user = session.query(User).get(id)
+        if not user:
+            return None
+        if products_limit is not None:
+            attach_products(session, [user], products_limit)
+        return ORMJSONResponse(user, adapter=user_out_adapter).body
+
+
+# API protegida por el token
+# Las peticiones iguales que llegan a la vez (mismo id, parámetros y formato) comparten una sola consulta
+# y reciben los mismos bytes (ver SingleFlight). El token se valida con get_current_user_released para que
+# las peticiones que esperan el resultado no retengan una conexión del pool
+@router.get("/user/{id}", response_model=UserOut,
+            dependencies=[Depends(get_current_user_released), Depends(query_budget(3))])
+async def read_user(id: UUID, products_limit: Optional[int] = Query(None, ge=0),
+                    fields: Optional[tuple] = Depends(get_user_fields)):
+    media_type = MSGPACK_MEDIA_TYPES[0] if use_msgpack.get() else ORMJSONResponse.media_type
+    body = await user_reads.do((id, products_limit, fields, media_type),
+                               lambda: run_in_group("reads", _render_user, id, products_limit, fields))
+    # Verificar si el id existe. Si no, devolver respuesta 404 Not found
+    if body is None:
+        raise HTTPException(status_code=404, detail=f"Usuario con id {id} no se encuentra en la BD")
+    return Response(body, media_type=media_type)
+
+
+@router.put("/user/{id}", response_model=UserOut, dependencies=[Depends(get_current_user)])
+def update_user(id: UUID, user_update: UserCreate, session: Session = Depends(get_db)):
+    user = session.query(User).get(id)  # Obtenemos el usuario de la BD
+    if user:
+        user.first_name = user_update.first_name
+        user.last_name = user_update.last_name
+        user.city = user_update.city
+        session.commit()
+        forget_user_reads(id)
+    if not user:
+        raise HTTPException(status_code=404, detail=f"Usuario con id {id} no fue encontrado para poder actualizarlo")
+    return user
+
+
+@router.delete("/user/{id}", status_code=status.HTTP_204_NO_CONTENT)
+def delete_user(id: UUID, session: Session = Depends(get_db)):
+    # Eliminamos con una sola sentencia DELETE; los productos del usuario se borran en la BD
+    # gracias al ON DELETE CASCADE, sin cargar el usuario ni sus productos en memoria
+    deleted = session.query(User).filter(User.id == id).delete(synchronize_session=False)
+    session.commit()
+    forget_user_reads(id)
+    if not deleted:
+        raise HTTPException(status_code=404, detail=f"Usuario con el id {id} no fue encontrado")
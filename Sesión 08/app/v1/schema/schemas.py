@@ -1,5 +1,7 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, TypeAdapter, create_model
 from typing import Optional, List
+from enum import Enum
+from functools import lru_cache
 
 from uuid import UUID
 
@@ -14,10 +16,26 @@ class ProductCreate(ProductBase):
 
 class ProductOut(ProductBase):
     id: int
+    # La columna price admite NULL (productos cargados sin la API)
+    price: Optional[float] = None
     class Config:
         from_attributes = True
 
 
+# Orden disponible para listar los productos de un usuario
+class ProductSort(str, Enum):
+    id_asc = "id"
+    id_desc = "-id"
+    price_asc = "price"
+    price_desc = "-price"
+
+
+# Página de productos: 'next_cursor' se envía en la siguiente petición para obtener la siguiente página
+class ProductPage(BaseModel):
+    items: List[ProductOut]
+    next_cursor: Optional[str] = None
+
+
 # Creamos el esquema en base a los campos del modelo de User
 class UserBase(BaseModel):
     first_name: str
@@ -39,6 +57,55 @@ class UserOut(UserBase):
         from_attributes = True
 
 
+# Adaptadores para serializar usuarios directamente a bytes JSON (ver ORMJSONResponse)
+user_out_adapter = TypeAdapter(UserOut)
+user_out_list_adapter = TypeAdapter(List[UserOut])
+
+
+# Crea (y guarda en caché) una versión de UserOut con solo los campos indicados, para que las
+# respuestas con ?fields=... serialicen únicamente esos campos
+@lru_cache(maxsize=128)
+def user_out_projection(fields: tuple):
+    definitions = {field: (UserOut.model_fields[field].annotation, UserOut.model_fields[field].default)
+                   for field in fields}
+    return create_model("UserOutFields", __config__={"from_attributes": True}, **definitions)
+
+
+@lru_cache(maxsize=128)
+def user_out_projection_adapter(fields: tuple):
+    return TypeAdapter(user_out_projection(fields))
+
+
+@lru_cache(maxsize=128)
+def user_out_projection_list(fields: tuple):
+    return TypeAdapter(List[user_out_projection(fields)])
+
+
+# Esquemas del documento de empleado (ver employee.json)
+class EmployeeAddress(BaseModel):
+    street: str
+    city: str
+    zip: str
+
+
+class EmployeePhoneNumber(BaseModel):
+    type: str
+    number: str
+
+
+class EmployeeCreate(BaseModel):
+    name: str
+    age: int
+    email: str
+    address: Optional[EmployeeAddress] = None
+    phone_numbers: List[EmployeePhoneNumber] = []
+
+
+class EmployeeIngestResult(BaseModel):
+    inserted: int
+    batches: int
+
+
 class Token(BaseModel):
     access_token: str
     token_type: str
@@ -15,8 +15,63 @@ class Settings(BaseSettings):
     db_pass: str = os.getenv('DB_PASS')
     db_host: str = os.getenv('DB_HOST')
     db_port: str = os.getenv('DB_PORT')
-    db_url: str = f"{db}://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+    # DATABASE_URL permite usar otra BD completa (ej: sqlite:///bench.db para los benchmarks)
+    db_url: str = os.getenv('DATABASE_URL') or f"{db}://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
     secret_key: str = os.getenv('SECRET_KEY')
+    # Pool de conexiones del engine (por proceso). pool_recycle renueva las conexiones antiguas
+    db_pool_size: int = int(os.getenv('DB_POOL_SIZE', 5))
+    db_max_overflow: int = int(os.getenv('DB_MAX_OVERFLOW', 10))
+    db_pool_recycle: int = int(os.getenv('DB_POOL_RECYCLE', 1800))
+    # Lanzador con varios workers (serve.py): cantidad de workers (0 = uno por CPU disponible) y
+    # conexiones de Postgres a repartir entre sus pools (0 = consultar max_connections a la BD)
+    web_concurrency: int = int(os.getenv('WEB_CONCURRENCY', 0))
+    db_max_connections: int = int(os.getenv('DB_MAX_CONNECTIONS', 0))
+    db_reserved_connections: int = int(os.getenv('DB_RESERVED_CONNECTIONS', 10))
+    # Hilos para las APIs síncronas por grupo de rutas (ver executors.py); en total los 40 de anyio
+    executor_limits: str = os.getenv('EXECUTOR_LIMITS', 'auth=8,reads=24,writes=8')
+    # Límite de concurrencia adaptativo (ver middleware/concurrency.py): límite inicial y rango, cuánto más
+    # que la latencia de referencia de su ruta (veces + ms) hace lenta una petición, cola de espera y rutas
+    # que no se limitan (prefijos separados por comas)
+    concurrency_limit_enabled: bool = os.getenv('CONCURRENCY_LIMIT_ENABLED', 'true').lower() == 'true'
+    concurrency_initial_limit: int = int(os.getenv('CONCURRENCY_INITIAL_LIMIT', 20))
+    concurrency_min_limit: int = int(os.getenv('CONCURRENCY_MIN_LIMIT', 2))
+    concurrency_max_limit: int = int(os.getenv('CONCURRENCY_MAX_LIMIT', 200))
+    concurrency_latency_tolerance: float = float(os.getenv('CONCURRENCY_LATENCY_TOLERANCE', 2.0))
+    concurrency_latency_slack_ms: float = float(os.getenv('CONCURRENCY_LATENCY_SLACK_MS', 50))
+    concurrency_queue_size: int = int(os.getenv('CONCURRENCY_QUEUE_SIZE', 100))
+    concurrency_queue_timeout_ms: float = float(os.getenv('CONCURRENCY_QUEUE_TIMEOUT_MS', 1000))
+    concurrency_exempt_paths: str = os.getenv('CONCURRENCY_EXEMPT_PATHS', '/metrics,/admin,/employees/ingest')
+    # Rate limit por token bucket (ver utils/rate_limit.py): reglas "[route] METHOD RUTA=peticiones/segundos"
+    # separadas por ";" y almacén de los buckets ("memory" o la URL de Redis para compartirlos entre nodos).
+    # Con "memory" cada worker de serve.py tiene sus propios buckets: con N workers el límite real es N veces el
+    # configurado (serve.py lo advierte al iniciar)
+    rate_limits: str = os.getenv('RATE_LIMITS', 'POST /token=10/60;POST /new_user/=10/60;GET /all_users=60/60')
+    rate_limit_store: str = os.getenv('RATE_LIMIT_STORE', 'memory')
+    # Idempotency-Key (ver middleware/idempotency.py): rutas "METHOD RUTA" separadas por ";", almacén
+    # ("memory" o la URL de Redis), segundos que se guarda cada respuesta y máximo que una clave queda "en curso"
+    idempotent_routes: str = os.getenv('IDEMPOTENT_ROUTES', 'POST /new_user/;POST /users/*')
+    idempotency_store: str = os.getenv('IDEMPOTENCY_STORE', 'memory')
+    idempotency_ttl_seconds: float = float(os.getenv('IDEMPOTENCY_TTL_SECONDS', 86400))
+    idempotency_lock_ttl_seconds: float = float(os.getenv('IDEMPOTENCY_LOCK_TTL_SECONDS', 60))
+    # Crear las tablas al iniciar la app (en Lambda se desactiva para no conectarse durante el cold start)
+    create_tables_on_startup: bool = os.getenv('CREATE_TABLES_ON_STARTUP', 'true').lower() == 'true'
+    # Routers a cargar (nombres de app/v1/routers separados por comas); vacío = todos
+    app_routers: str = os.getenv('APP_ROUTERS', '')
+    # Usuarios (username separados por comas) que pueden usar las APIs de /admin
+    admin_users: str = os.getenv('ADMIN_USERS', '')
+    # Compresión de respuestas: tamaño mínimo para comprimir y tamaño desde el cual se comprime en un hilo
+    compression_min_size: int = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    compression_offload_size: int = int(os.getenv('COMPRESSION_OFFLOAD_SIZE', 256 * 1024))
+    # Detección de consultas lentas y N+1 (ver db_stats.py)
+    slow_query_threshold_ms: float = float(os.getenv('SLOW_QUERY_THRESHOLD_MS', 200))
+    slow_query_explain: bool = os.getenv('SLOW_QUERY_EXPLAIN', 'true').lower() == 'true'
+    n_plus_one_threshold: int = int(os.getenv('N_PLUS_ONE_THRESHOLD', 5))
+    # Monitor del event loop: cada cuánto se mide el retraso y desde qué retraso se registra la pila
+    loop_monitor_enabled: bool = os.getenv('LOOP_MONITOR_ENABLED', 'true').lower() == 'true'
+    loop_lag_interval_ms: float = float(os.getenv('LOOP_LAG_INTERVAL_MS', 100))
+    loop_lag_threshold_ms: float = float(os.getenv('LOOP_LAG_THRESHOLD_MS', 100))
+    # En modo estricto (tests) superar el presupuesto de consultas de una ruta lanza una excepción
+    query_budget_strict: bool = os.getenv('QUERY_BUDGET_STRICT', 'false').lower() == 'true'
 
 
 settings = Settings()
@@ -0,0 +1,182 @@
+import logging
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import settings
+from .metrics import REGISTRY, Counter, Histogram, LATENCY_BUCKETS, route_label
+
+logger = logging.getLogger("app.db")
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+# Contadores de SQL de una petición: número de sentencias, tiempo total en la BD y filas obtenidas.
+# También guarda cuántas veces se repitió cada sentencia (para detectar N+1) y el presupuesto de
+# consultas declarado por la ruta con query_budget()
+class QueryStats:
+    __slots__ = ("statements", "duration_ns", "rows", "scope", "repeated", "budget", "warned")
+
+    def __init__(self, scope=None):
+        self.statements = 0
+        self.duration_ns = 0
+        self.rows = 0
+        self.scope = scope
+        self.repeated = {}
+        self.budget = None
+        self.warned = set()
+
+    @property
+    def route(self) -> str:
+        return route_label(self.scope) if self.scope is not None else "unknown"
+
+    @property
+    def duration(self) -> float:
+        return self.duration_ns / 1e9
+
+
+# Estadísticas de la petición actual. La asigna ProcessTimeMiddleware y, como las APIs síncronas se
+# ejecutan en el threadpool con una copia del contexto, los eventos de SQLAlchemy la ven desde el hilo
+current_query_stats: ContextVar[Optional[QueryStats]] = ContextVar("current_query_stats", default=None)
+
+DB_STATEMENTS = REGISTRY.register(Histogram(
+    "http_request_db_statements", "Sentencias SQL ejecutadas por petición", ("method", "route"),
+    buckets=(0, 1, 2, 3, 5, 10, 20, 50, 100, 200, 500, 1000),
+))
+DB_DURATION = REGISTRY.register(Histogram(
+    "http_request_db_duration_seconds", "Tiempo total en la BD por petición", ("method", "route"),
+    buckets=LATENCY_BUCKETS,
+))
+DB_SLOW_QUERIES = REGISTRY.register(Counter(
+    "db_slow_queries_total", "Consultas que superaron SLOW_QUERY_THRESHOLD_MS", ("route",),
+))
+DB_N_PLUS_ONE = REGISTRY.register(Counter(
+    "db_n_plus_one_total", "Peticiones en las que se detectó un patrón N+1", ("route",),
+))
+
+
+# Los eventos se registran sobre la clase Engine, así cubren todos los engines de la aplicación
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_start", []).append((cursor, time.perf_counter_ns()))
+
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter_ns() - conn.info["query_start"].pop()[1]
+    stats = current_query_stats.get()
+    if elapsed >= settings.slow_query_threshold_ms * 1e6:
+        _log_slow_query(conn, statement, parameters, elapsed, stats)
+    if stats is None:
+        return
+    stats.statements += 1
+    stats.duration_ns += elapsed
+    # Para los SELECT psycopg2 informa en rowcount las filas obtenidas (otros drivers, como sqlite3,
+    # devuelven -1 y no se cuentan)
+    if cursor.description is not None and cursor.rowcount > 0:
+        stats.rows += cursor.rowcount
+    if not executemany:
+        _check_n_plus_one(stats, statement, parameters)
+    if stats.budget is not None and stats.statements > stats.budget:
+        _budget_exceeded(stats, statement)
+
+
+# Si la sentencia falla no se ejecuta after_cursor_execute: se quita aquí su hora de inicio para que la
+# pila de la conexión (que vuelve al pool) no crezca ni entregue la hora equivocada a las sentencias siguientes.
+# Solo si es la de su cursor: un error dentro de after_cursor_execute (QueryBudgetExceeded) ya la quitó
+@event.listens_for(Engine, "handle_error")
+def _handle_error(exception_context):
+    conn, context = exception_context.connection, exception_context.execution_context
+    query_start = conn.info.get("query_start") if conn is not None else None
+    if query_start and context is not None and query_start[-1][0] is context.cursor:
+        query_start.pop()
+
+
+# Patrón N+1: la misma sentencia ejecutada muchas veces en una petición con parámetros distintos
+# (ej: cargar User.products de forma perezosa para cada usuario de una lista)
+def _check_n_plus_one(stats: QueryStats, statement: str, parameters) -> None:
+    seen = stats.repeated.setdefault(statement, set())
+    if len(seen) >= settings.n_plus_one_threshold:
+        return
+    seen.add(repr(parameters))
+    if len(seen) == settings.n_plus_one_threshold:
+        DB_N_PLUS_ONE.inc(1, stats.route)
+        logger.warning("Posible N+1 en %s: la misma sentencia se ejecutó con %d parámetros distintos: %s",
+                       stats.route, len(seen), statement)
+
+
+def _budget_exceeded(stats: QueryStats, statement: str) -> None:
+    message = (f"La ruta {stats.route} superó su presupuesto de {stats.budget} consultas "
+               f"({stats.statements}); última sentencia: {statement}")
+    if settings.query_budget_strict:
+        raise QueryBudgetExceeded(message)
+    if "budget" not in stats.warned:
+        stats.warned.add("budget")
+        logger.warning(message)
+
+
+def _log_slow_query(conn, statement: str, parameters, elapsed: int, stats: Optional[QueryStats]) -> None:
+    route = stats.route if stats is not None else "sin petición"
+    DB_SLOW_QUERIES.inc(1, route)
+    plan = None
+    if settings.slow_query_explain and statement.lstrip()[:6].upper() == "SELECT":
+        plan = _explain(conn, statement, parameters)
+    # Solo la sentencia: los parámetros pueden tener datos sensibles (ej: el hash bcrypt de una contraseña)
+    logger.warning("Consulta lenta (%.1f ms) en %s: %s%s", elapsed / 1e6, route, statement,
+                   f"\nPlan:\n{plan}" if plan else "")
+
+
+# Obtiene el plan de ejecución con un cursor nuevo del driver (el cursor original todavía tiene
+# las filas de la consulta sin leer). Nunca debe hacer fallar la petición: en PostgreSQL una sentencia
+# con error aborta la transacción abierta, así que el EXPLAIN va dentro de un SAVEPOINT y si falla se
+# vuelve a él (se usa el cursor del driver directamente para no disparar de nuevo estos eventos)
+def _explain(conn, statement: str, parameters) -> Optional[str]:
+    sqlite = conn.dialect.name == "sqlite"
+    prefix = "EXPLAIN QUERY PLAN " if sqlite else "EXPLAIN "
+    try:
+        cursor = conn.connection.dbapi_connection.cursor()
+        try:
+            if not sqlite:
+                cursor.execute("SAVEPOINT explain_plan")
+            try:
+                cursor.execute(prefix + statement, parameters)
+                rows = cursor.fetchall()
+            except Exception:
+                if not sqlite:
+                    cursor.execute("ROLLBACK TO SAVEPOINT explain_plan")
+                    cursor.execute("RELEASE SAVEPOINT explain_plan")
+                raise
+            if not sqlite:
+                cursor.execute("RELEASE SAVEPOINT explain_plan")
+            return "\n".join(" ".join(str(column) for column in row) for row in rows)
+        finally:
+            cursor.close()
+    except Exception as exc:
+        return f"(no se pudo obtener el plan: {exc})"
+
+
+# Dependencia para declarar cuántas sentencias SQL puede ejecutar una ruta, ej:
+#   @app.get("/all_users", dependencies=[Depends(query_budget(3))])
+# Si se supera se registra una advertencia, o se lanza QueryBudgetExceeded con QUERY_BUDGET_STRICT=true
+def query_budget(statements: int):
+    def set_query_budget():
+        stats = current_query_stats.get()
+        if stats is not None:
+            stats.budget = statements
+    return set_query_budget
+
+
+# Header Server-Timing con el tiempo en la BD y el total de la petición (en milisegundos)
+def server_timing(stats: QueryStats, total_seconds: float) -> str:
+    return (f'db;dur={stats.duration * 1000:.3f};desc="{stats.statements} queries, {stats.rows} rows", '
+            f'app;dur={total_seconds * 1000:.3f}')
+
+
+def record_query_stats(stats: QueryStats, method: str, route: str) -> None:
+    DB_STATEMENTS.observe(stats.statements, method, route)
+    DB_DURATION.observe(stats.duration, method, route)
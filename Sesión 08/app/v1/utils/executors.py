@@ -0,0 +1,103 @@
+import functools
+import time
+from typing import Callable, Dict
+
+import anyio
+from anyio import CapacityLimiter
+
+from .config import settings
+from .metrics import REGISTRY, Gauge, Histogram
+
+# FastAPI ejecuta todas las APIs síncronas en el mismo threadpool de anyio (40 hilos): unas pocas
+# peticiones lentas (bcrypt en /token o un listado grande) pueden ocuparlo y hacer esperar a todas las
+# demás. Aquí cada grupo de rutas tiene su propio CapacityLimiter con su capacidad:
+#   auth   -> APIs marcadas con @executor_group("auth") (hash y verificación de contraseñas)
+#   reads  -> el resto de APIs GET
+#   writes -> el resto de APIs POST, PUT, DELETE...
+#   admin  -> APIs de administración que ocupan un hilo mucho tiempo (/admin/profile); 1 hilo si
+#             EXECUTOR_LIMITS no lo indica, para que no quiten hilos a las lecturas
+# Las dependencias síncronas (get_db, get_current_user) siguen usando el threadpool por defecto
+READ_METHODS = {"GET", "HEAD", "OPTIONS"}
+
+
+def _parse_limits(value: str) -> Dict[str, int]:
+    limits = {}
+    for item in value.split(","):
+        if item.strip():
+            group, tokens = item.split("=")
+            limits[group.strip()] = int(tokens)
+    return limits
+
+
+LIMITS = {"admin": 1, **_parse_limits(settings.executor_limits)}
+
+# Los limiters se crean con la primera petición de cada grupo: anyio necesita un event loop en ejecución
+_limiters: Dict[str, CapacityLimiter] = {}
+
+EXECUTOR_WAIT = REGISTRY.register(Histogram(
+    "executor_wait_seconds", "Tiempo que una API síncrona esperó un hilo libre de su grupo", ("group",),
+))
+
+
+def get_limiter(group: str) -> CapacityLimiter:
+    limiter = _limiters.get(group)
+    if limiter is None:
+        limiter = _limiters[group] = CapacityLimiter(LIMITS[group])
+    return limiter
+
+
+# Marca la API con el grupo de hilos en que debe ejecutarse (se aplica debajo del decorador de la ruta)
+def executor_group(group: str):
+    if group not in LIMITS:
+        raise ValueError(f"Grupo de hilos desconocido: {group}")
+
+    def decorator(func: Callable) -> Callable:
+        func.executor_group = group
+        return func
+
+    return decorator
+
+
+# Ejecuta 'func' en un hilo del grupo indicado (también lo usan las APIs async que delegan trabajo síncrono)
+async def run_in_group(group: str, func: Callable, *args):
+    queued = time.perf_counter()
+
+    def run():
+        EXECUTOR_WAIT.observe(time.perf_counter() - queued, group)
+        return func(*args)
+
+    return await anyio.to_thread.run_sync(run, limiter=get_limiter(group))
+
+
+# Convierte una API síncrona en una asíncrona que la ejecuta en un hilo del limiter de su grupo.
+# functools.wraps conserva la firma original, que es la que FastAPI usa para leer los parámetros
+def limit_endpoint(endpoint: Callable, methods) -> Callable:
+    group = getattr(endpoint, "executor_group", None)
+    if group is None:
+        group = "reads" if set(methods or ()) <= READ_METHODS else "writes"
+
+    @functools.wraps(endpoint)
+    async def wrapper(**kwargs):
+        return await run_in_group(group, functools.partial(endpoint, **kwargs))
+
+    return wrapper
+
+
+# Ocupación de cada grupo para /metrics: hilos en uso, peticiones en cola y capacidad
+def _executor_stats(attribute: str):
+    def callback():
+        values = {}
+        for group, limiter in list(_limiters.items()):
+            statistics = limiter.statistics()
+            values[(group,)] = getattr(statistics, attribute)
+        return values
+
+    return callback
+
+
+EXECUTOR_IN_USE = REGISTRY.register(Gauge("executor_threads_in_use", "Hilos ocupados por grupo", ("group",)))
+EXECUTOR_IN_USE.set_function(_executor_stats("borrowed_tokens"))
+EXECUTOR_QUEUED = REGISTRY.register(Gauge("executor_queue_depth", "APIs esperando un hilo por grupo", ("group",)))
+EXECUTOR_QUEUED.set_function(_executor_stats("tasks_waiting"))
+EXECUTOR_CAPACITY = REGISTRY.register(Gauge("executor_capacity", "Capacidad (hilos) de cada grupo", ("group",)))
+EXECUTOR_CAPACITY.set_function(_executor_stats("total_tokens"))
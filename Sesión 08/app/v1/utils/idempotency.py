@@ -0,0 +1,143 @@
+import base64
+import json
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Registro guardado por cada Idempotency-Key:
+#   {"fingerprint": ..., "state": "in_flight"}                                     mientras se ejecuta
+#   {"fingerprint": ..., "state": "done", "status": 200, "headers": [...], "body": "<base64>"}
+# El cuerpo se guarda en base64 para poder serializar el registro en JSON (Redis)
+IN_FLIGHT = "in_flight"
+DONE = "done"
+
+
+# Lee las rutas de IDEMPOTENT_ROUTES: "METHOD RUTA" separadas por ";". Como en RATE_LIMITS, la ruta es
+# exacta o un prefijo terminado en "*" (ej: "POST /new_user/;POST /users/*")
+def parse_routes(value: str) -> List[Tuple[str, str]]:
+    routes = []
+    for item in value.split(";"):
+        if item.strip():
+            method, path = item.split()
+            routes.append((method.upper(), path))
+    return routes
+
+
+def match_route(routes: List[Tuple[str, str]], method: str, path: str) -> bool:
+    for route_method, route_path in routes:
+        if route_method != method:
+            continue
+        if route_path.endswith("*") and path.startswith(route_path[:-1]) or path == route_path:
+            return True
+    return False
+
+
+def response_record(fingerprint: str, status: int, headers, body: bytes) -> dict:
+    return {
+        "fingerprint": fingerprint,
+        "state": DONE,
+        "status": status,
+        "headers": [[name.decode("latin-1"), value.decode("latin-1")] for name, value in headers],
+        "body": base64.b64encode(body).decode("ascii"),
+    }
+
+
+def record_response(record: dict) -> Tuple[int, list, bytes]:
+    headers = [(name.encode("latin-1"), value.encode("latin-1")) for name, value in record["headers"]]
+    return record["status"], headers, base64.b64decode(record["body"])
+
+
+# Interfaz de los almacenes de respuestas idempotentes:
+# - begin: registra la clave como "en curso" solo si no existe (atómico) y devuelve None; si ya existe
+#   devuelve el registro guardado. 'lock_ttl' evita que una clave quede bloqueada si el proceso muere
+# - complete: guarda la respuesta durante 'ttl' segundos
+# - discard: elimina la clave (la API falló y el cliente puede reintentar)
+class IdempotencyStore(ABC):
+    @abstractmethod
+    async def begin(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[dict]:
+        ...
+
+    @abstractmethod
+    async def complete(self, key: str, record: dict, ttl: float) -> None:
+        ...
+
+    @abstractmethod
+    async def discard(self, key: str) -> None:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+# Registros en la memoria del proceso (cada worker tiene los suyos: con varios workers o nodos usar Redis).
+# Están ordenados del usado hace más tiempo al más reciente (LRU): al guardar uno se eliminan del principio
+# los vencidos y, si aún se supera 'max_keys', los menos usados. Así el costo por petición es O(1)
+class InMemoryIdempotencyStore(IdempotencyStore):
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._records: "OrderedDict[str, Tuple[dict, float]]" = OrderedDict()     # clave -> (registro, vencimiento)
+
+    async def begin(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[dict]:
+        now = self.clock()
+        entry = self._records.get(key)
+        if entry is not None and entry[1] > now:
+            self._records.move_to_end(key)
+            return entry[0]
+        self._store(key, {"fingerprint": fingerprint, "state": IN_FLIGHT}, now + lock_ttl, now)
+        return None
+
+    async def complete(self, key: str, record: dict, ttl: float) -> None:
+        now = self.clock()
+        self._store(key, record, now + ttl, now)
+
+    async def discard(self, key: str) -> None:
+        self._records.pop(key, None)
+
+    def _store(self, key: str, record: dict, expires: float, now: float) -> None:
+        self._records[key] = (record, expires)
+        self._records.move_to_end(key)
+        while self._records:
+            _, oldest_expires = next(iter(self._records.values()))
+            if len(self._records) <= self.max_keys and oldest_expires > now:
+                break
+            self._records.popitem(last=False)
+
+
+# Registros en Redis: SET NX PX marca la clave como "en curso" de forma atómica entre todos los nodos
+class RedisIdempotencyStore(IdempotencyStore):
+    def __init__(self, client, prefix: str = "idempotency:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisIdempotencyStore":
+        import redis.asyncio
+        return cls(redis.asyncio.from_url(url), **kwargs)
+
+    async def begin(self, key: str, fingerprint: str, lock_ttl: float) -> Optional[dict]:
+        value = json.dumps({"fingerprint": fingerprint, "state": IN_FLIGHT})
+        # Si la clave vence justo entre el SET y el GET se vuelve a intentar
+        while True:
+            if await self.client.set(self.prefix + key, value, nx=True, px=int(lock_ttl * 1000)):
+                return None
+            stored = await self.client.get(self.prefix + key)
+            if stored is not None:
+                return json.loads(stored)
+
+    async def complete(self, key: str, record: dict, ttl: float) -> None:
+        await self.client.set(self.prefix + key, json.dumps(record), px=int(ttl * 1000))
+
+    async def discard(self, key: str) -> None:
+        await self.client.delete(self.prefix + key)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+# Crea el almacén configurado en IDEMPOTENCY_STORE: "memory" o la URL de Redis (redis://host:6379/0)
+def create_idempotency_store(value: str) -> IdempotencyStore:
+    if value.startswith(("redis://", "rediss://", "unix://")):
+        return RedisIdempotencyStore.from_url(value)
+    return InMemoryIdempotencyStore()
@@ -0,0 +1,134 @@
+import codecs
+import json
+import uuid
+from typing import List
+
+from pydantic import ValidationError
+from sqlalchemy import insert
+from sqlalchemy.orm import Session
+
+from ..model.model import Employee, EmployeeAddress, EmployeePhoneNumber
+from ..schema.schemas import EmployeeCreate
+
+
+class IngestError(ValueError):
+    pass
+
+
+# Parser JSON incremental: recibe el cuerpo por partes (chunks) y devuelve cada documento completo en
+# cuanto termina de llegar, sin cargar el archivo entero en memoria. Acepta dos formatos:
+# - Un arreglo JSON: [{...}, {...}, ...]
+# - NDJSON (un objeto por línea) o objetos concatenados: {...}\n{...}\n...
+# Un documento incompleto solo se vuelve a decodificar cuando llega un '}' nuevo (sin él no puede haber
+# terminado un objeto); aun así, un objeto grande con muchos '}' anidados que llega en chunks pequeños se
+# decodifica desde el principio una vez por cada chunk que trae alguno
+class JSONStreamParser:
+    def __init__(self, max_document_size: int = 1024 * 1024):
+        self.max_document_size = max_document_size
+        self._decoder = json.JSONDecoder()
+        self._text = codecs.getincrementaldecoder("utf-8")()
+        self._buffer = ""
+        self._is_array = None
+        self._expect_comma = False
+        self._finished = False
+        self._tried = 0                 # caracteres del documento incompleto ya revisados sin éxito
+        self.count = 0
+
+    def feed(self, chunk: bytes, final: bool = False) -> List[dict]:
+        self._buffer += self._text.decode(chunk, final=final)
+        documents = []
+        position = 0
+        buffer = self._buffer
+        while True:
+            position = _skip_whitespace(buffer, position)
+            if position == len(buffer):
+                break
+            if self._finished:
+                raise IngestError(f"Contenido inesperado después del final del arreglo (documento {self.count})")
+            if self._is_array is None:
+                self._is_array = buffer[position] == "["
+                if self._is_array:
+                    position += 1
+                    continue
+            if self._is_array:
+                if buffer[position] == "]":
+                    self._finished = True
+                    position += 1
+                    continue
+                if self._expect_comma:
+                    if buffer[position] != ",":
+                        raise IngestError(f"Se esperaba ',' después del documento {self.count}")
+                    self._expect_comma = False
+                    position = _skip_whitespace(buffer, position + 1)
+                    if position == len(buffer):
+                        break
+            if not final and "}" not in buffer[position + self._tried:]:
+                if len(buffer) - position > self.max_document_size:
+                    raise IngestError(f"El documento {self.count} supera el tamaño máximo de "
+                                      f"{self.max_document_size} caracteres")
+                self._tried = len(buffer) - position
+                break
+            try:
+                document, end = self._decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError as exc:
+                # Lo más probable es que el documento aún no haya llegado completo
+                if final or len(buffer) - position > self.max_document_size:
+                    raise IngestError(f"JSON inválido en el documento {self.count}: {exc.msg}")
+                self._tried = len(buffer) - position
+                break
+            if not isinstance(document, dict):
+                raise IngestError(f"El documento {self.count} no es un objeto JSON")
+            documents.append(document)
+            self.count += 1
+            self._expect_comma = self._is_array
+            self._tried = 0
+            position = end
+        self._buffer = buffer[position:]
+        if final and self._is_array and not self._finished:
+            raise IngestError("El arreglo JSON no se cerró con ']'")
+        return documents
+
+
+def _skip_whitespace(buffer: str, position: int) -> int:
+    while position < len(buffer) and buffer[position] in " \t\r\n":
+        position += 1
+    return position
+
+
+# Valida los documentos con EmployeeCreate. 'offset' es el número de documentos ya procesados y sirve
+# para indicar en el error qué documento falló
+def validate_employees(documents: List[dict], offset: int = 0) -> List[EmployeeCreate]:
+    employees = []
+    for index, document in enumerate(documents):
+        try:
+            employees.append(EmployeeCreate.model_validate(document))
+        except ValidationError as exc:
+            raise IngestError(f"Documento {offset + index} inválido: {exc.errors(include_url=False)}")
+    return employees
+
+
+# Inserta un lote de empleados con tres INSERT multi-fila (empleados, direcciones y teléfonos).
+# Los ids se generan aquí para no necesitar un RETURNING por cada empleado
+def insert_employees(session: Session, employees: List[EmployeeCreate]):
+    employee_rows, address_rows, phone_rows = [], [], []
+    for employee in employees:
+        employee_id = uuid.uuid4()
+        employee_rows.append({"id": employee_id, "name": employee.name, "age": employee.age, "email": employee.email})
+        if employee.address is not None:
+            address_rows.append({"employee_id": employee_id, **employee.address.model_dump()})
+        phone_rows.extend({"employee_id": employee_id, **phone.model_dump()} for phone in employee.phone_numbers)
+
+    if employee_rows:
+        session.execute(insert(Employee), employee_rows)
+    if address_rows:
+        session.execute(insert(EmployeeAddress), address_rows)
+    if phone_rows:
+        session.execute(insert(EmployeePhoneNumber), phone_rows)
+    session.commit()
+
+
+# Valida e inserta un lote de documentos; se ejecuta en el threadpool desde la API de ingesta
+def ingest_batch(session: Session, documents: List[dict], offset: int = 0) -> int:
+    employees = validate_employees(documents, offset)
+    insert_employees(session, employees)
+    return len(employees)
@@ -0,0 +1,76 @@
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+
+from .metrics import REGISTRY, Counter, Gauge, Histogram
+
+logger = logging.getLogger("app.loop")
+
+LOOP_LAG = REGISTRY.register(Histogram(
+    "event_loop_lag_seconds", "Retraso del event loop respecto al intervalo esperado",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+))
+LOOP_LAG_LAST = REGISTRY.register(Gauge("event_loop_lag_last_seconds", "Último retraso medido del event loop"))
+LOOP_BLOCKED = REGISTRY.register(Counter(
+    "event_loop_blocked_total", "Veces que el event loop estuvo bloqueado más que el umbral",
+))
+
+
+# Monitor del event loop:
+# - Una tarea del loop duerme 'interval' segundos y mide cuánto tarde despierta (lag). Todo el retraso
+#   es tiempo en que el loop no pudo atender otras peticiones (ej: código síncrono en una API async)
+# - Un hilo vigilante revisa el último latido de esa tarea; si el loop lleva más de 'threshold'
+#   segundos sin responder, toma la pila del hilo del loop y la registra en el log para saber qué lo bloqueó
+class LoopLagMonitor:
+    def __init__(self, interval: float = 0.1, threshold: float = 0.1):
+        self.interval = interval
+        self.threshold = threshold
+        self._heartbeat = time.perf_counter()
+        self._reported_heartbeat = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopped = threading.Event()
+        self._watchdog: Optional[threading.Thread] = None
+
+    async def _measure(self) -> None:
+        while True:
+            self._heartbeat = start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, time.perf_counter() - start - self.interval)
+            LOOP_LAG.observe(lag)
+            LOOP_LAG_LAST.set(lag)
+
+    def _watch(self) -> None:
+        while not self._stopped.wait(self.threshold / 2):
+            heartbeat = self._heartbeat
+            stalled = time.perf_counter() - heartbeat - self.interval
+            if stalled > self.threshold and self._reported_heartbeat != heartbeat:
+                # Se reporta una sola vez por cada bloqueo
+                self._reported_heartbeat = heartbeat
+                LOOP_BLOCKED.inc()
+                frame = sys._current_frames().get(self._loop_thread_id)
+                stack = "".join(traceback.format_stack(frame)) if frame is not None else "(sin pila)"
+                logger.warning("Event loop bloqueado por más de %.0f ms. Pila del hilo del loop:\n%s",
+                               stalled * 1000, stack)
+
+    def start(self) -> None:
+        self._loop_thread_id = threading.get_ident()
+        self._stopped.clear()
+        self._task = asyncio.get_running_loop().create_task(self._measure())
+        self._watchdog = threading.Thread(target=self._watch, name="loop-lag-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stopped.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        if self._watchdog is not None:
+            self._watchdog.join()
@@ -0,0 +1,134 @@
+import threading
+import tracemalloc
+from collections import OrderedDict
+from enum import Enum
+from typing import Dict, List, Optional
+
+from .metrics import REGISTRY, Histogram
+
+# Se guardan como máximo estas instantáneas (se descartan las más antiguas)
+MAX_SNAPSHOTS = 10
+
+REQUEST_MEMORY_PEAK = REGISTRY.register(Histogram(
+    "http_request_memory_peak_bytes", "Pico de memoria asignada durante la petición (solo con tracemalloc activo)",
+    ("method", "route"),
+    buckets=(1 << 10, 1 << 14, 1 << 17, 1 << 20, 1 << 22, 1 << 24, 1 << 26, 1 << 28, 1 << 30),
+))
+
+_snapshots: "OrderedDict[int, tracemalloc.Snapshot]" = OrderedDict()
+_next_snapshot_id = 1
+_route_peaks: Dict[str, int] = {}
+_lock = threading.Lock()
+
+# Se excluyen las asignaciones del propio tracemalloc y del sistema de imports
+_FILTERS = (
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+    tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+    tracemalloc.Filter(False, "<unknown>"),
+)
+
+
+class TracingNotStarted(RuntimeError):
+    pass
+
+
+# Cómo agrupar las asignaciones: por línea, por archivo o por pila completa
+class GroupBy(str, Enum):
+    lineno = "lineno"
+    filename = "filename"
+    traceback = "traceback"
+
+
+def start_tracing(frames: int = 25) -> None:
+    if not tracemalloc.is_tracing():
+        tracemalloc.start(frames)
+    with _lock:
+        _route_peaks.clear()
+
+
+def stop_tracing() -> None:
+    tracemalloc.stop()
+    with _lock:
+        _snapshots.clear()
+
+
+def status() -> dict:
+    current, peak = tracemalloc.get_traced_memory()
+    with _lock:
+        return {"tracing": tracemalloc.is_tracing(), "current_bytes": current, "peak_bytes": peak,
+                "snapshots": list(_snapshots), "route_peak_bytes": dict(_route_peaks)}
+
+
+def take_snapshot() -> int:
+    global _next_snapshot_id
+    if not tracemalloc.is_tracing():
+        raise TracingNotStarted("tracemalloc no está activo; usar /admin/memory/start")
+    snapshot = tracemalloc.take_snapshot().filter_traces(_FILTERS)
+    with _lock:
+        snapshot_id = _next_snapshot_id
+        _next_snapshot_id += 1
+        _snapshots[snapshot_id] = snapshot
+        while len(_snapshots) > MAX_SNAPSHOTS:
+            _snapshots.popitem(last=False)
+    return snapshot_id
+
+
+def get_snapshot(snapshot_id: int) -> tracemalloc.Snapshot:
+    with _lock:
+        if snapshot_id not in _snapshots:
+            raise KeyError(snapshot_id)
+        return _snapshots[snapshot_id]
+
+
+# Lugares del código que más memoria tienen asignada, agrupados por línea ('lineno'), archivo
+# ('filename') o pila completa ('traceback')
+def top_allocations(snapshot: tracemalloc.Snapshot, group_by: str = "lineno", limit: int = 20) -> List[dict]:
+    return [{"location": _location(stat.traceback, group_by), "size_bytes": stat.size, "count": stat.count}
+            for stat in snapshot.statistics(group_by)[:limit]]
+
+
+# Diferencia entre dos instantáneas ordenada por crecimiento: muestra dónde aumentó la memoria
+def diff_snapshots(base: tracemalloc.Snapshot, target: tracemalloc.Snapshot, group_by: str = "lineno",
+                   limit: int = 20) -> List[dict]:
+    return [{"location": _location(stat.traceback, group_by), "size_diff_bytes": stat.size_diff,
+             "size_bytes": stat.size, "count_diff": stat.count_diff, "count": stat.count}
+            for stat in target.compare_to(base, group_by)[:limit]]
+
+
+def _location(traceback: tracemalloc.Traceback, group_by: str) -> str:
+    if group_by == "traceback":
+        return " <- ".join(f"{frame.filename}:{frame.lineno}" for frame in traceback)
+    frame = traceback[0]
+    return frame.filename if group_by == "filename" else f"{frame.filename}:{frame.lineno}"
+
+
+# Pico de memoria por ruta. tracemalloc tiene un solo pico para todo el proceso y reset_peak() lo
+# reinicia para todos, así que se mide una sola petición a la vez: mientras una está en muestreo las
+# demás no se miden (si cada una reiniciara el pico, borraría el de las que siguen en curso). El valor
+# incluye lo que asignaron las peticiones concurrentes: sirve para encontrar la ruta responsable de un
+# aumento, no como medida exacta. Sin tracemalloc activo no tiene costo
+_sampling = threading.Lock()
+
+
+def request_started() -> Optional[int]:
+    if not tracemalloc.is_tracing() or not _sampling.acquire(blocking=False):
+        return None
+    tracemalloc.reset_peak()
+    return tracemalloc.get_traced_memory()[0]
+
+
+# Se debe llamar siempre que request_started() devolvió un valor: libera el muestreo para otra petición
+def request_finished(baseline: Optional[int], method: str, route: str) -> None:
+    if baseline is None:
+        return
+    try:
+        if tracemalloc.is_tracing():
+            peak = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+            REQUEST_MEMORY_PEAK.observe(peak, method, route)
+            key = f"{method} {route}"
+            with _lock:
+                if peak > _route_peaks.get(key, 0):
+                    _route_peaks[key] = peak
+    finally:
+        _sampling.release()
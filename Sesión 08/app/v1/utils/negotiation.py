@@ -0,0 +1,22 @@
+from typing import Dict
+
+
+# Lee un header con valores q (Accept, Accept-Encoding) y devuelve {valor en minúsculas: calidad}.
+# Se revisan todos los parámetros separados por ";" (ej: "application/msgpack;charset=x;q=0") y el
+# nombre del parámetro no distingue mayúsculas ("Q=0" equivale a "q=0"). Un q inválido cuenta como 0
+def parse_quality_values(header: str) -> Dict[str, float]:
+    weights = {}
+    for item in header.split(","):
+        name, *params = item.split(";")
+        name = name.strip().lower()
+        quality = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    quality = float(value.strip())
+                except ValueError:
+                    quality = 0.0
+        if name:
+            weights[name] = quality
+    return weights
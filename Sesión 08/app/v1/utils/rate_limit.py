@@ -0,0 +1,172 @@
+import heapq
+import math
+import time
+from abc import ABC, abstractmethod
+from typing import Dict, List, Tuple
+
+# Resultado de consumir de un bucket: (permitido, tokens restantes, segundos hasta llenarse,
+# segundos hasta tener el siguiente token)
+BucketState = Tuple[bool, int, float, float]
+
+
+# Regla de rate limit: 'capacity' peticiones de ráfaga que se recargan a razón de capacity/period por
+# segundo (token bucket). 'path' es la ruta exacta o un prefijo terminado en "*"; method "*" = todos.
+# Con scope "client" cada cliente tiene su bucket; con "route" todos los clientes comparten uno
+class RateLimitRule:
+    def __init__(self, method: str, path: str, capacity: int, period: float, scope: str = "client"):
+        if scope not in ("client", "route"):
+            raise ValueError(f"Alcance de rate limit desconocido: {scope}")
+        self.method = method.upper()
+        self.path = path
+        self.capacity = capacity
+        self.period = period
+        self.rate = capacity / period
+        self.scope = scope
+        self.name = f"{self.method} {path}"
+
+    def matches(self, method: str, path: str) -> bool:
+        if self.method != "*" and self.method != method:
+            return False
+        if self.path.endswith("*"):
+            return path.startswith(self.path[:-1])
+        return path == self.path
+
+
+# Lee las reglas del formato de RATE_LIMITS: "[route] METHOD RUTA=peticiones/segundos" separadas por ";"
+# (ej: "POST /token=10/60;GET /all_users=60/60;route GET /all_users=600/60")
+def parse_rules(value: str) -> List[RateLimitRule]:
+    rules = []
+    for item in value.split(";"):
+        if not item.strip():
+            continue
+        target, limit = item.rsplit("=", 1)
+        parts = target.split()
+        scope = parts.pop(0) if len(parts) == 3 else "client"
+        capacity, period = limit.split("/")
+        rules.append(RateLimitRule(parts[0], parts[1], int(capacity), float(period), scope))
+    return rules
+
+
+# Interfaz de los almacenes de buckets. consume() debe ser atómico por clave: con varios procesos o
+# nodos el almacén compartido (RedisStore) es el que garantiza que no se consuman más tokens de la cuenta
+class RateLimitStore(ABC):
+    @abstractmethod
+    async def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> BucketState:
+        ...
+
+    async def close(self) -> None:
+        pass
+
+
+def _bucket_state(allowed: bool, tokens: float, capacity: int, rate: float) -> BucketState:
+    return allowed, int(tokens), (capacity - tokens) / rate, max(0.0, (1 - tokens) / rate)
+
+
+# Buckets en la memoria del proceso: cada worker tiene los suyos (el límite efectivo se multiplica por el
+# número de workers o nodos). Cada bucket guarda el momento en que se llenará con su propia recarga, y un
+# heap ordena los buckets por ese momento: los que ya se llenaron se eliminan porque equivalen a no tener
+# uno, y si aún se supera 'max_keys' se elimina el que se llenará primero (el que menos tokens regala al
+# descartarlo). El heap puede tener entradas viejas de un bucket ya actualizado; se ignoran al sacarlas y
+# se reconstruye cuando acumula demasiadas, así el costo por petición es O(log n)
+class InMemoryStore(RateLimitStore):
+    def __init__(self, max_keys: int = 100_000, clock=time.monotonic):
+        self.max_keys = max_keys
+        self.clock = clock
+        self._buckets: Dict[str, Tuple[float, float, float]] = {}     # clave -> (tokens, actualización, lleno en)
+        self._full_at: List[Tuple[float, str]] = []                   # heap de (lleno en, clave)
+
+    # No hay await entre la lectura y la escritura, así que es atómico dentro del event loop
+    async def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> BucketState:
+        now = self.clock()
+        tokens, updated, _ = self._buckets.get(key, (capacity, now, now))
+        tokens = min(capacity, tokens + (now - updated) * rate)
+        allowed = tokens >= cost
+        if allowed:
+            tokens -= cost
+        full_at = now + (capacity - tokens) / rate
+        self._buckets[key] = (tokens, now, full_at)
+        heapq.heappush(self._full_at, (full_at, key))
+        self._evict(now)
+        return _bucket_state(allowed, tokens, capacity, rate)
+
+    def _evict(self, now: float):
+        while self._full_at and (self._full_at[0][0] <= now or len(self._buckets) > self.max_keys):
+            full_at, key = heapq.heappop(self._full_at)
+            bucket = self._buckets.get(key)
+            if bucket is not None and bucket[2] == full_at:
+                del self._buckets[key]
+        if len(self._full_at) > 2 * len(self._buckets) + 1024:
+            self._full_at = [(bucket[2], key) for key, bucket in self._buckets.items()]
+            heapq.heapify(self._full_at)
+
+
+# Token bucket en Redis con un script Lua: se ejecuta de forma atómica en el servidor y usa el reloj de
+# Redis (TIME), así todos los nodos comparten los mismos buckets aunque sus relojes no coincidan.
+# La clave expira cuando el bucket se llenaría, para no acumular claves de clientes inactivos
+TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or capacity
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - updated) * rate)
+local allowed = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil((capacity - tokens) / rate * 1000) + 1000)
+return {allowed, tostring(tokens)}
+"""
+
+
+# 'client' es un cliente asíncrono con eval(script, numkeys, *keys_y_args), como redis.asyncio.Redis.
+# En pruebas se puede usar cualquier sustituto local con la misma interfaz (ej: fakeredis.aioredis)
+class RedisStore(RateLimitStore):
+    def __init__(self, client, prefix: str = "ratelimit:"):
+        self.client = client
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, **kwargs) -> "RedisStore":
+        import redis.asyncio
+        return cls(redis.asyncio.from_url(url), **kwargs)
+
+    async def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> BucketState:
+        allowed, tokens = await self.client.eval(TOKEN_BUCKET_LUA, 1, self.prefix + key, capacity, rate, cost)
+        return _bucket_state(bool(int(allowed)), float(tokens), capacity, rate)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+REDIS_URL_PREFIXES = ("redis://", "rediss://", "unix://")
+
+
+# Crea el almacén configurado en RATE_LIMIT_STORE: "memory" o la URL de Redis (redis://host:6379/0)
+def create_store(value: str) -> RateLimitStore:
+    if value.startswith(REDIS_URL_PREFIXES):
+        return RedisStore.from_url(value)
+    return InMemoryStore()
+
+
+# Headers de rate limit (borrador IETF "RateLimit header fields for HTTP")
+def rate_limit_headers(rule: RateLimitRule, state: BucketState) -> List[Tuple[bytes, bytes]]:
+    allowed, remaining, reset_after, retry_after = state
+    headers = [
+        (b"ratelimit-limit", str(rule.capacity).encode()),
+        (b"ratelimit-remaining", str(remaining).encode()),
+        (b"ratelimit-reset", str(math.ceil(reset_after)).encode()),
+        (b"ratelimit-policy", f"{rule.capacity};w={rule.period:g}".encode()),
+    ]
+    if not allowed:
+        headers.append((b"retry-after", str(max(1, math.ceil(retry_after))).encode()))
+    return headers
+
+
+def match_rules(rules: List[RateLimitRule], method: str, path: str) -> List[RateLimitRule]:
+    return [rule for rule in rules if rule.matches(method, path)]
@@ -0,0 +1,84 @@
+import json
+from contextvars import ContextVar
+from typing import Any, Mapping, Optional, Tuple
+
+from pydantic import TypeAdapter
+from starlette.background import BackgroundTask
+from starlette.responses import JSONResponse, Response
+
+from .negotiation import parse_quality_values
+
+# msgpack es opcional: si no está instalado todas las respuestas se envían en JSON
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+
+MSGPACK_MEDIA_TYPES = ("application/msgpack", "application/x-msgpack")
+
+# Indica si la petición actual pidió MessagePack (lo asigna NegotiatedRoute en app/v1/utils/routing.py)
+use_msgpack: ContextVar[bool] = ContextVar("use_msgpack", default=False)
+
+
+# Devuelve True si el header Accept prefiere MessagePack sobre JSON (respetando los valores q)
+def prefers_msgpack(accept: str) -> bool:
+    if msgpack is None or not accept:
+        return False
+    weights = parse_quality_values(accept)
+    msgpack_quality = max(weights.get(media_type, 0.0) for media_type in MSGPACK_MEDIA_TYPES)
+    json_quality = max(weights.get("application/json", 0.0), weights.get("application/*", 0.0),
+                       weights.get("*/*", 0.0))
+    return msgpack_quality > 0 and msgpack_quality >= json_quality
+
+
+# Convierte un cuerpo JSON o MessagePack ya codificado al formato que prefiere 'accept' (ej: al repetir una
+# respuesta guardada para otra petición). Devuelve el cuerpo y su content-type; otros tipos no se tocan
+def renegotiate(body: bytes, content_type: str, accept: str) -> Tuple[bytes, str]:
+    media_type = content_type.split(";")[0].strip().lower()
+    wants_msgpack = prefers_msgpack(accept)
+    if media_type == "application/json" and wants_msgpack:
+        return msgpack.packb(json.loads(body)), MSGPACK_MEDIA_TYPES[0]
+    if media_type in MSGPACK_MEDIA_TYPES and not wants_msgpack:
+        # Mismo formato que JSONResponse.render
+        content = json.dumps(msgpack.unpackb(body), ensure_ascii=False, allow_nan=False, separators=(",", ":"))
+        return content.encode("utf-8"), "application/json"
+    return body, content_type
+
+
+# Respuesta por defecto de la app: JSON, o MessagePack cuando el cliente lo pidió en Accept.
+# El contenido ya viene convertido a tipos de JSON por FastAPI, así que msgpack lo empaqueta directo
+class NegotiatedJSONResponse(JSONResponse):
+    # Se repite la firma de JSONResponse: FastAPI la inspecciona para obtener el status_code del OpenAPI
+    def __init__(self, content: Any, status_code: int = 200, headers: Optional[Mapping[str, str]] = None,
+                 media_type: Optional[str] = None, background: Optional[BackgroundTask] = None):
+        if use_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPES[0]
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        if self.media_type in MSGPACK_MEDIA_TYPES:
+            return msgpack.packb(content)
+        return super().render(content)
+
+
+# Respuesta JSON que valida los objetos del ORM con un TypeAdapter y los convierte directamente a
+# bytes JSON con el serializador compilado de pydantic-core. Con 'response_model' FastAPI valida,
+# convierte a dict/list de Python y luego vuelve a recorrer todo con json.dumps; aquí se hace en un
+# solo paso dentro de pydantic-core. Si el cliente pidió MessagePack se empaquetan los mismos datos.
+class ORMJSONResponse(Response):
+    media_type = "application/json"
+
+    def __init__(self, content: Any, adapter: TypeAdapter, status_code: int = 200,
+                 headers: Optional[Mapping[str, str]] = None, media_type: Optional[str] = None,
+                 background: Optional[BackgroundTask] = None):
+        self.adapter = adapter
+        if use_msgpack.get():
+            self.media_type = MSGPACK_MEDIA_TYPES[0]
+        super().__init__(content, status_code, headers, media_type, background)
+
+    def render(self, content: Any) -> bytes:
+        value = self.adapter.validate_python(content, from_attributes=True)
+        if self.media_type in MSGPACK_MEDIA_TYPES:
+            return msgpack.packb(self.adapter.dump_python(value, mode="json"))
+        return self.adapter.dump_json(value)
@@ -0,0 +1,54 @@
+import asyncio
+from typing import Any, Callable
+
+from fastapi import HTTPException, Request, Response
+from fastapi.routing import APIRoute
+
+from .executors import limit_endpoint
+from .responses import MSGPACK_MEDIA_TYPES, msgpack, prefers_msgpack, use_msgpack
+
+
+# Ruta que permite a los clientes internos usar MessagePack en lugar de JSON con los mismos esquemas:
+# - Content-Type: application/msgpack -> el cuerpo se decodifica y se valida igual que un JSON
+# - Accept: application/msgpack -> la respuesta se empaqueta con msgpack (ver NegotiatedJSONResponse)
+# Además las APIs síncronas se ejecutan en el grupo de hilos que les corresponde (ver executors.py)
+class NegotiatedRoute(APIRoute):
+    def __init__(self, path: str, endpoint: Callable[..., Any], **kwargs):
+        if not asyncio.iscoroutinefunction(endpoint):
+            endpoint = limit_endpoint(endpoint, kwargs.get("methods"))
+        super().__init__(path, endpoint, **kwargs)
+
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+            if msgpack is not None and content_type in MSGPACK_MEDIA_TYPES:
+                request = await _msgpack_request(request)
+
+            token = use_msgpack.set(prefers_msgpack(request.headers.get("accept", "")))
+            try:
+                response = await original_route_handler(request)
+            finally:
+                use_msgpack.reset(token)
+            response.headers.append("Vary", "Accept")
+            return response
+
+        return route_handler
+
+
+# Crea una nueva Request con el cuerpo ya decodificado y el Content-Type cambiado a JSON para que
+# FastAPI valide el cuerpo con el mismo esquema (UserCreate, ProductCreate, UserA, ...)
+async def _msgpack_request(request: Request) -> Request:
+    body = await request.body()
+    scope = dict(request.scope)
+    scope["headers"] = [(name, value) for name, value in request.scope["headers"] if name != b"content-type"]
+    scope["headers"].append((b"content-type", b"application/json"))
+    new_request = Request(scope, request.receive)
+    new_request._body = body
+    if body:
+        try:
+            new_request._json = msgpack.unpackb(body)
+        except (ValueError, msgpack.ExtraData, msgpack.FormatError, msgpack.StackError):
+            raise HTTPException(status_code=400, detail="El cuerpo no es un MessagePack válido")
+    return new_request
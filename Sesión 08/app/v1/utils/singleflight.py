@@ -0,0 +1,78 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional
+from uuid import UUID
+
+from .metrics import REGISTRY, Counter
+
+SINGLEFLIGHT_CALLS = REGISTRY.register(Counter(
+    "singleflight_calls_total", "Cálculos ejecutados (uno por grupo de peticiones idénticas)", ("name",),
+))
+SINGLEFLIGHT_COALESCED = REGISTRY.register(Counter(
+    "singleflight_coalesced_total", "Peticiones que reutilizaron un cálculo ya en curso", ("name",),
+))
+
+
+# Agrupa las peticiones idénticas que llegan al mismo tiempo ("single flight"): la primera ejecuta el
+# cálculo (consulta a la BD + serialización) y las demás esperan ese mismo resultado en lugar de repetirlo.
+# Al terminar el cálculo la clave se libera, así que no es un caché: una petición posterior vuelve a
+# consultar la BD. Cuando muchas peticiones piden lo mismo a la vez (un perfil muy visitado o justo
+# después de una invalidación) se hace una sola consulta en lugar de una por petición.
+# El cálculo corre en su propia tarea: si el cliente que lo inició se desconecta, los demás lo reciben igual
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._calls: Dict[Hashable, asyncio.Task] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        self._loop = asyncio.get_running_loop()
+        task = self._calls.get(key)
+        if task is None:
+            SINGLEFLIGHT_CALLS.inc(1, self.name)
+            task = self._calls[key] = asyncio.ensure_future(func())
+            task.add_done_callback(lambda done: self._finished(key, done))
+        else:
+            SINGLEFLIGHT_COALESCED.inc(1, self.name)
+        return await asyncio.shield(task)
+
+    def _finished(self, key: Hashable, task: asyncio.Task):
+        # forget() puede haber quitado la clave (o una petición posterior haberla reemplazado)
+        if self._calls.get(key) is task:
+            self._calls.pop(key, None)
+        # Marca el error como leído por si todos los que esperaban se cancelaron
+        if not task.cancelled():
+            task.exception()
+
+    # Después de una escritura: las peticiones siguientes no se unen a cálculos que empezaron antes.
+    # Las APIs síncronas la llaman desde el threadpool: _calls solo se modifica en el event loop, así que
+    # desde otro hilo se agenda con call_soon_threadsafe. Se ejecuta antes de que la API devuelva su
+    # respuesta (anyio entrega el resultado del hilo al loop también con call_soon_threadsafe, después)
+    def forget(self, match: Callable[[Hashable], bool]):
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._forget(match)
+            return
+        try:
+            loop.call_soon_threadsafe(self._forget, match)
+        except RuntimeError:
+            pass        # el loop se cerró: sus cálculos ya no existen
+
+    def _forget(self, match: Callable[[Hashable], bool]):
+        for key in list(self._calls):
+            if match(key):
+                del self._calls[key]
+
+
+# Lecturas en curso de GET /user/{id}; las claves empiezan con el id del usuario
+user_reads = SingleFlight("read_user")
+
+
+# Después de modificar un usuario (o sus productos) las lecturas nuevas no deben unirse a una en curso
+def forget_user_reads(id: UUID):
+    user_reads.forget(lambda key: key[0] == id)
@@ -0,0 +1,29 @@
+import importlib
+import time
+
+# Tiempos de arranque de este proceso (en segundos), en el orden en que ocurrieron
+_phases = {}
+_routers = {}
+_started = time.perf_counter()
+
+
+# Registra el tiempo transcurrido desde que se importó este módulo (al inicio de main.py)
+def mark(phase: str):
+    _phases[phase] = time.perf_counter() - _started
+
+
+# Importa el módulo de un router y registra cuánto tardó (incluye los módulos que importa por primera vez)
+def import_router(module_name: str):
+    start = time.perf_counter()
+    module = importlib.import_module(module_name)
+    _routers[module_name] = time.perf_counter() - start
+    return module.router
+
+
+# Resumen en milisegundos; 'ready' es el tiempo hasta que terminó el arranque (lifespan) y el proceso
+# empieza a atender peticiones
+def report() -> dict:
+    return {
+        "phases_ms": {phase: round(seconds * 1000, 2) for phase, seconds in _phases.items()},
+        "routers_ms": {name: round(seconds * 1000, 2) for name, seconds in _routers.items()},
+    }
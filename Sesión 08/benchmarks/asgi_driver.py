@@ -0,0 +1,48 @@
+"""
+Cliente ASGI mínimo para los benchmarks: llama a la app directamente (sin red ni httpx) y devuelve
+el código de estado, los headers y el cuerpo de la respuesta.
+"""
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+async def request(app, method: str, url: str, headers: Optional[Dict[str, str]] = None,
+                  body: bytes = b"") -> Tuple[int, List[Tuple[bytes, bytes]], bytes]:
+    parts = urlsplit(url)
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": method,
+        "scheme": "http",
+        "path": parts.path,
+        "raw_path": parts.path.encode(),
+        "query_string": parts.query.encode(),
+        "root_path": "",
+        "headers": [(name.lower().encode(), value.encode()) for name, value in (headers or {}).items()]
+                   + [(b"host", b"bench"), (b"content-length", str(len(body)).encode())],
+        "client": ("127.0.0.1", 50000),
+        "server": ("bench", 80),
+    }
+    request_sent = False
+    status = 0
+    response_headers = []
+    chunks = []
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": body, "more_body": False}
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        nonlocal status, response_headers
+        if message["type"] == "http.response.start":
+            status = message["status"]
+            response_headers = message.get("headers", [])
+        elif message["type"] == "http.response.body":
+            chunks.append(message.get("body", b""))
+
+    await app(scope, receive, send)
+    return status, response_headers, b"".join(chunks)
@@ -0,0 +1,98 @@
+"""
+Benchmark del cold start en Lambda
+
+Ejecuta varias veces un proceso nuevo de Python que importa lambda_handler (inicialización) y luego
+invoca al handler con un evento de API Gateway (primera invocación y una invocación "warm"). Con
+--importtime muestra además los módulos que más tardan en importarse (python -X importtime).
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.bench_cold_start --runs 10 --importtime
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+SESSION_DIR = Path(__file__).resolve().parent.parent
+
+CHILD = r"""
+import json, sys, time
+from types import SimpleNamespace
+start = time.perf_counter()
+import lambda_handler
+init = time.perf_counter() - start
+
+def event(path):
+    return {
+        "version": "2.0", "routeKey": "$default", "rawPath": path, "rawQueryString": "",
+        "headers": {"host": "localhost", "accept": "application/json"}, "isBase64Encoded": False,
+        "requestContext": {"http": {"method": "GET", "path": path, "protocol": "HTTP/1.1",
+                                    "sourceIp": "127.0.0.1", "userAgent": "bench"},
+                           "requestId": "bench", "stage": "$default"},
+    }
+
+context = SimpleNamespace(function_name="bench", aws_request_id="bench")
+start = time.perf_counter()
+first = lambda_handler.handler(event(sys.argv[1]), context)
+first_time = time.perf_counter() - start
+start = time.perf_counter()
+lambda_handler.handler(event(sys.argv[1]), context)
+warm_time = time.perf_counter() - start
+print(json.dumps({"init": init, "first": first_time, "warm": warm_time, "status": first["statusCode"],
+                  "modules": len(sys.modules)}))
+"""
+
+
+# Módulos de primer nivel (los que se importan directamente) ordenados por tiempo acumulado de
+# -X importtime. Cada línea tiene el formato "import time: propio | acumulado | nombre"
+def parse_importtime(stderr: str, top: int):
+    # Suma el tiempo propio de cada módulo en su paquete raíz (fastapi, sqlalchemy, pydantic...)
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        self_us, _, name = line.split("|")
+        package = name.strip().split(".")[0]
+        totals[package] = totals.get(package, 0) + int(self_us.split(":")[1])
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=10)
+    parser.add_argument("--path", default="/", help="Ruta a invocar")
+    parser.add_argument("--importtime", action="store_true")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+
+    env = {**os.environ, "PYTHONDONTWRITEBYTECODE": "0"}
+    runs = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        completed = subprocess.run([sys.executable, "-c", CHILD, args.path], cwd=SESSION_DIR, env=env,
+                                   capture_output=True, text=True, check=True)
+        result = json.loads(completed.stdout.strip().splitlines()[-1])
+        result["process"] = time.perf_counter() - start
+        runs.append(result)
+
+    print(f"{'medida':<28}{'mediana ms':>12}{'máx ms':>10}")
+    for key, label in (("process", "proceso completo"), ("init", "import lambda_handler"),
+                       ("first", "primera invocación"), ("warm", "invocación warm")):
+        values = [run[key] * 1000 for run in runs]
+        print(f"{label:<28}{statistics.median(values):>12.1f}{max(values):>10.1f}")
+    print(f"código de estado: {runs[0]['status']}, módulos cargados: {runs[0]['modules']}")
+
+    if args.importtime:
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", "import lambda_handler"],
+                                   cwd=SESSION_DIR, env=env, capture_output=True, text=True, check=True)
+        print("\nPaquetes más lentos de importar (suma del tiempo propio):")
+        for name, self_us in parse_importtime(completed.stderr, args.top):
+            print(f"  {name:<40}{self_us / 1000:>10.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Benchmark del costo por petición de los middlewares
+
+Compara los dos middlewares @app.middleware("http") anteriores (BaseHTTPMiddleware) con
+ProcessTimeMiddleware (ASGI puro) sobre una API trivial, llamando a la app directamente.
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.bench_middleware --requests 20000
+"""
+import argparse
+import asyncio
+import time
+
+from fastapi import FastAPI, Request
+
+from app.v1.middleware.timing import ProcessTimeMiddleware
+from benchmarks.asgi_driver import request
+
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/")
+    async def root():
+        return {"name": "Carolina Gutierrez", "city": "Lima", "age": 24}
+
+    return app
+
+
+def bare_app() -> FastAPI:
+    return make_app()
+
+
+# Los dos middlewares "http" que tenía main.py (con call_next(request) corregido)
+def base_http_app() -> FastAPI:
+    app = make_app()
+
+    @app.middleware("http")
+    async def add_custom_header(request: Request, call_next):
+        response = await call_next(request)
+        response.headers["X-hi-name"] = "Hi Carol welcome!"
+        return response
+
+    @app.middleware("http")
+    async def add_process_time_header(request: Request, call_next):
+        start_time = time.time()
+        response = await call_next(request)
+        response.headers["X-process-Time"] = str(time.time() - start_time)
+        return response
+
+    return app
+
+
+def asgi_app() -> FastAPI:
+    app = make_app()
+    app.add_middleware(ProcessTimeMiddleware, headers={"X-hi-name": "Hi Carol welcome!"})
+    return app
+
+
+async def run(app, requests: int) -> float:
+    for _ in range(200):    # Calentamiento
+        await request(app, "GET", "/")
+    start = time.perf_counter()
+    for _ in range(requests):
+        await request(app, "GET", "/")
+    return (time.perf_counter() - start) / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000)
+    args = parser.parse_args()
+
+    results = {}
+    for name, factory in (("sin middleware", bare_app), ("BaseHTTPMiddleware x2", base_http_app),
+                          ("ProcessTimeMiddleware", asgi_app)):
+        results[name] = asyncio.run(run(factory(), args.requests))
+    bare = results["sin middleware"]
+    for name, per_request in results.items():
+        print(f"{name:<24} {per_request * 1e6:8.1f} µs/petición  (+{(per_request - bare) * 1e6:6.1f} µs)")
+
+
+if __name__ == "__main__":
+    main()
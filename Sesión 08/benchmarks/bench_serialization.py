@@ -0,0 +1,74 @@
+"""
+Benchmark de serialización de la lista de usuarios (/all_users)
+
+Compara el camino por defecto de FastAPI (response_model -> validación -> objetos de Python ->
+json.dumps en JSONResponse) con ORMJSONResponse (validación y JSON en pydantic-core).
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.bench_serialization --users 10000 --products 3
+"""
+import argparse
+import asyncio
+import time
+import uuid
+from types import SimpleNamespace
+from typing import List
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+
+from app.v1.schema.schemas import UserOut, user_out_list_adapter
+from app.v1.utils.responses import ORMJSONResponse
+
+
+# Filas con la misma forma que los objetos User/Product del ORM (se leen por atributos)
+def make_rows(users: int, products: int):
+    return [
+        SimpleNamespace(
+            id=uuid.uuid4(), first_name=f"Nombre{i}", last_name=f"Apellido{i}", city="Lima",
+            username=f"usuario{i}", hashed_password="$2b$12$" + "x" * 53,
+            products=[SimpleNamespace(id=i * products + j, name_product=f"Producto {j}", price=9.9 + j)
+                      for j in range(products)],
+        )
+        for i in range(users)
+    ]
+
+
+def fastapi_default(rows, field):
+    content = asyncio.run(serialize_response(field=field, response_content=rows, is_coroutine=True))
+    return JSONResponse(content).body
+
+
+def orm_json_response(rows, field):
+    return ORMJSONResponse(rows, adapter=user_out_list_adapter).body
+
+
+def measure(name, func, rows, field, repeat):
+    body = func(rows, field)    # Calentamiento
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func(rows, field)
+        timings.append(time.perf_counter() - start)
+    best = min(timings)
+    print(f"{name:<22} mejor={best * 1000:9.1f} ms  {len(rows) / best:12,.0f} usuarios/s  {len(body):,} bytes")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--products", type=int, default=3, help="Productos por usuario")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rows = make_rows(args.users, args.products)
+    field = create_response_field(name="Response_list_users", type_=List[UserOut])
+    baseline = measure("fastapi response_model", fastapi_default, rows, field, args.repeat)
+    fast = measure("ORMJSONResponse", orm_json_response, rows, field, args.repeat)
+    print(f"Aceleración: {baseline / fast:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark del tiempo de arranque de un worker
+
+Un worker nuevo (ej: al escalar) no atiende peticiones hasta que termina de importar la app y de
+ejecutar el arranque (lifespan). Este script inicia varias veces un proceso nuevo de Python con
+-X importtime que importa main, ejecuta el lifespan y reporta:
+    - import: tiempo hasta terminar de importar main (incluye los routers)
+    - ready: tiempo hasta terminar el lifespan (crear tablas, monitor del event loop)
+    - el import de cada router de app/v1/routers (ver APP_ROUTERS en config.py)
+    - los paquetes y los módulos de la app que más tardan en importarse (python -X importtime)
+
+Con --routers se puede medir un proceso que carga solo algunos routers (ej: --routers auth,users).
+Los resultados se pueden guardar como línea base (--save-baseline) y las siguientes ejecuciones se
+comparan contra ella: si 'import' o 'ready' empeoran más que --tolerance el proceso termina con código 1.
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.bench_startup --runs 5 --save-baseline
+    python -m benchmarks.bench_startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from benchmarks.bench_cold_start import SESSION_DIR, parse_importtime
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+
+CHILD = r"""
+import asyncio, json
+
+import main
+from app.v1.utils import startup
+
+
+# Ejecuta solo el inicio del protocolo lifespan de ASGI (lo mismo que hace uvicorn antes de aceptar conexiones)
+async def run_startup():
+    messages = [{"type": "lifespan.startup"}]
+    started = asyncio.Event()
+
+    async def receive():
+        if messages:
+            return messages.pop()
+        await asyncio.Event().wait()
+
+    async def send(message):
+        if message["type"] != "lifespan.startup.complete":
+            raise RuntimeError(message)
+        started.set()
+
+    task = asyncio.create_task(main.app({"type": "lifespan", "asgi": {"version": "3.0"}, "state": {}}, receive, send))
+    await started.wait()
+    task.cancel()
+
+asyncio.run(run_startup())
+print(json.dumps(startup.report()))
+"""
+
+
+# Módulos propios de la app (main y app.*) ordenados por tiempo acumulado de import
+def app_modules(stderr: str, top: int):
+    totals = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative_us, name = line.split("|")
+        name = name.strip()
+        if name == "main" or name.startswith("app."):
+            totals[name] = int(cumulative_us)
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)[:top]
+
+
+# Compara con la línea base: empeora si la mediana de una fase sube más que 'tolerance'
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for phase, current in results["phases_ms"].items():
+        previous = baseline.get("phases_ms", {}).get(phase)
+        if previous is not None and current > previous * (1 + tolerance):
+            regressions.append(f"{phase}: {previous} ms -> {current} ms")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--routers", help="Routers a cargar (APP_ROUTERS); por defecto todos")
+    parser.add_argument("--database-url", help="Por defecto una BD SQLite temporal")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--baseline", type=Path, help="Archivo de línea base (por defecto baselines/startup.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    args = parser.parse_args()
+
+    tmpdir = tempfile.TemporaryDirectory()
+    env = {**os.environ, "DATABASE_URL": args.database_url or f"sqlite:///{tmpdir.name}/startup.db"}
+    if args.routers:
+        env["APP_ROUTERS"] = args.routers
+
+    reports, stderr = [], ""
+    for _ in range(args.runs):
+        completed = subprocess.run([sys.executable, "-X", "importtime", "-c", CHILD], cwd=SESSION_DIR, env=env,
+                                   capture_output=True, text=True, check=True)
+        reports.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+        stderr = completed.stderr
+
+    # Medianas de cada fase y de cada router entre todas las ejecuciones
+    results = {
+        key: {name: round(statistics.median(report[key][name] for report in reports), 2) for name in reports[0][key]}
+        for key in ("phases_ms", "routers_ms")
+    }
+
+    print(f"{'fase':<36}{'mediana ms':>12}")
+    for phase, value in results["phases_ms"].items():
+        print(f"{phase:<36}{value:>12.1f}")
+    for name, value in results["routers_ms"].items():
+        print(f"  {name:<34}{value:>12.1f}")
+
+    print("\nPaquetes más lentos de importar (suma del tiempo propio):")
+    for name, self_us in parse_importtime(stderr, args.top):
+        print(f"  {name:<40}{self_us / 1000:>10.1f} ms")
+    print("\nMódulos de la app más lentos de importar (tiempo acumulado):")
+    for name, cumulative_us in app_modules(stderr, args.top):
+        print(f"  {name:<40}{cumulative_us / 1000:>10.1f} ms")
+
+    baseline_path = args.baseline or BASELINE_DIR / "startup.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Línea base guardada en {baseline_path}")
+    elif baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+        if regressions:
+            print("Regresiones respecto a la línea base:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"Sin regresiones respecto a {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
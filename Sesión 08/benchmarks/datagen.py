@@ -0,0 +1,292 @@
+"""
+Generador de datos sintéticos para los benchmarks
+
+Genera usuarios y productos (tablas users / products), usuarios de la BD en memoria (UserA) y
+documentos de empleados (como employee.json) con distribuciones configurables. Los datos se generan
+por bloques (shards) de tamaño fijo, cada uno con su propia semilla derivada de --seed, así que el
+resultado es el mismo sin importar cuántos procesos (--workers) se usen.
+
+En el subcomando db, --run etiqueta la carga: los id y username de los usuarios dependen de ella, así que
+se puede volver a cargar sobre una BD con datos (sin --recreate) sin chocar con los de cargas anteriores.
+Por defecto es aleatoria; para repetir exactamente una carga usar el mismo --seed y --run.
+
+Subcomandos:
+    db          carga users y products en la BD (COPY en Postgres, INSERT multi-fila en otras BD; en
+                SQLite los procesos solo generan las filas porque admite un único escritor)
+    users       escribe usuarios UserA en NDJSON (para POST /api/v1/users)
+    employees   escribe empleados en NDJSON (para POST /employees/ingest)
+
+Distribuciones:
+    --products    fixed:N | uniform:A-B | poisson:MEDIA | zipf:S:MAX   (productos por usuario; zipf va de
+                  0 a MAX y 0 es el valor más frecuente: muchos usuarios sin productos y una cola larga)
+    --city-skew   0 = ciudades uniformes; valores mayores concentran los usuarios en las primeras ciudades
+    --name-length MIN-MAX caracteres de los nombres y apellidos
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.datagen db --users 1000000 --products poisson:5 --database-url sqlite:///bench.db
+    python -m benchmarks.datagen employees --count 2000000 --output employees.ndjson
+"""
+import argparse
+import csv
+import io
+import json
+import math
+import os
+import random
+import shutil
+import uuid
+from multiprocessing import Pool
+from typing import List
+
+SHARD_SIZE = 20000
+CITIES = ["Lima", "Arequipa", "Trujillo", "Chiclayo", "Piura", "Cusco", "Iquitos", "Huancayo", "Tacna", "Puno",
+          "Ica", "Cajamarca", "Ayacucho", "Chimbote", "Pucallpa"]
+SYLLABLES = ["ma", "ri", "lu", "ca", "sa", "to", "ne", "la", "pa", "ro", "mi", "go", "da", "fe", "li", "na", "jo",
+             "se", "vi", "an"]
+PRODUCTS = ["Laptop", "Mouse", "Teclado", "Monitor", "Audífonos", "Silla", "Escritorio", "Cámara", "Parlante",
+            "Tablet", "Impresora", "Router"]
+
+
+class Generator:
+    def __init__(self, seed: int, shard: int, args):
+        # La semilla de cada shard depende solo de --seed y del número de shard
+        self.rng = random.Random(f"{seed}-{shard}")
+        self.name_length = tuple(int(value) for value in args.name_length.split("-"))
+        weights = [1 / (rank ** args.city_skew) for rank in range(1, len(CITIES) + 1)]
+        self.city_weights = list(_cumulative(weights))
+        self.products = getattr(args, "products", "fixed:0")
+        if self.products.startswith("zipf:"):
+            _, exponent, maximum = self.products.split(":")
+            # El valor k (0..MAX) tiene peso 1 / (k + 1)^S
+            self.zipf_weights = list(_cumulative([1 / (k ** float(exponent)) for k in range(1, int(maximum) + 2)]))
+
+    def uuid(self) -> uuid.UUID:
+        return uuid.UUID(int=self.rng.getrandbits(128), version=4)
+
+    def name(self) -> str:
+        length = self.rng.randint(*self.name_length)
+        text = ""
+        while len(text) < length:
+            text += self.rng.choice(SYLLABLES)
+        return text[:length].capitalize()
+
+    def city(self) -> str:
+        return self.rng.choices(CITIES, cum_weights=self.city_weights)[0]
+
+    def product_count(self) -> int:
+        kind, _, value = self.products.partition(":")
+        if kind == "fixed":
+            return int(value)
+        if kind == "uniform":
+            low, high = value.split("-")
+            return self.rng.randint(int(low), int(high))
+        if kind == "poisson":
+            return _poisson(self.rng, float(value))
+        if kind == "zipf":
+            return self.rng.choices(range(len(self.zipf_weights)), cum_weights=self.zipf_weights)[0]
+        raise ValueError(f"Distribución de productos desconocida: {self.products}")
+
+    def price(self) -> float:
+        return round(self.rng.lognormvariate(3.5, 1.0), 2)
+
+
+def _cumulative(weights):
+    total = 0.0
+    for weight in weights:
+        total += weight
+        yield total
+
+
+# Algoritmo de Knuth para medias pequeñas y aproximación normal para medias grandes
+def _poisson(rng: random.Random, mean: float) -> int:
+    if mean > 30:
+        return max(0, round(rng.gauss(mean, math.sqrt(mean))))
+    limit, count, product = math.exp(-mean), 0, rng.random()
+    while product > limit:
+        count += 1
+        product *= rng.random()
+    return count
+
+
+def shard_ranges(total: int):
+    return [(shard, start, min(start + SHARD_SIZE, total)) for shard, start in enumerate(range(0, total, SHARD_SIZE))]
+
+
+def generate_db_rows(args, shard: int, start: int, end: int):
+    generator = Generator(args.seed, shard, args)
+    # Los id se derivan de la etiqueta de la carga para que no se repitan entre cargas con la misma semilla
+    namespace = uuid.uuid5(uuid.NAMESPACE_OID, f"datagen-{args.run}")
+    users, products = [], []
+    for index in range(start, end):
+        user_id = uuid.uuid5(namespace, generator.uuid().hex)
+        users.append((str(user_id), generator.name(), generator.name(), generator.city(), f"{args.run}-user{index}",
+                      args.hashed_password))
+        for _ in range(generator.product_count()):
+            products.append((f"{generator.rng.choice(PRODUCTS)} {generator.name()}", generator.price(), str(user_id)))
+    return users, products
+
+
+def generate_shard(task):
+    args, shard, start, end = task
+    return generate_db_rows(args, shard, start, end)
+
+
+# Genera y carga un shard en la BD. Cada proceso usa su propio engine
+def load_shard(task):
+    from sqlalchemy import create_engine
+
+    args = task[0]
+    engine = create_engine(args.database_url)
+    try:
+        users, products = generate_shard(task)
+        insert_rows(engine, users, products)
+    finally:
+        engine.dispose()
+    return len(users), len(products)
+
+
+def insert_rows(engine, users, products) -> None:
+    from sqlalchemy import insert
+    from app.v1.model.model import User, Product
+
+    user_columns = ("id", "first_name", "last_name", "city", "username", "hashed_password")
+    if engine.dialect.name == "postgresql":
+        _copy_rows(engine, "users", user_columns, users)
+        _copy_rows(engine, "products", ("name_product", "price", "owner_id"), products)
+        return
+    with engine.begin() as connection:
+        connection.execute(insert(User), [dict(zip(user_columns, _with_uuid(row, 0))) for row in users])
+        for chunk in range(0, len(products), 10000):
+            connection.execute(insert(Product), [
+                {"name_product": name, "price": price, "owner_id": uuid.UUID(owner_id)}
+                for name, price, owner_id in products[chunk:chunk + 10000]
+            ])
+
+
+def _with_uuid(row, position: int):
+    row = list(row)
+    row[position] = uuid.UUID(row[position])
+    return row
+
+
+# COPY ... FROM STDIN es la forma más rápida de cargar filas en Postgres
+def _copy_rows(engine, table: str, columns, rows) -> None:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    connection = engine.raw_connection()
+    try:
+        with connection.cursor() as cursor:
+            cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+        connection.commit()
+    finally:
+        connection.close()
+
+
+def write_users_shard(task):
+    args, shard, start, end = task
+    generator = Generator(args.seed, shard, args)
+    path = f"{args.output}.part{shard:06d}"
+    with open(path, "w", encoding="utf-8") as file:
+        for _ in range(start, end):
+            roles = ["admin", "user"] if generator.rng.random() < 0.05 else ["user"]
+            file.write(json.dumps({"id": str(generator.uuid()), "first_name": generator.name(),
+                                   "last_name": generator.name(), "city": generator.city(), "roles": roles},
+                                  ensure_ascii=False) + "\n")
+    return path
+
+
+def write_employees_shard(task):
+    args, shard, start, end = task
+    generator = Generator(args.seed, shard, args)
+    path = f"{args.output}.part{shard:06d}"
+    with open(path, "w", encoding="utf-8") as file:
+        for index in range(start, end):
+            first_name, last_name = generator.name(), generator.name()
+            phones = [{"type": generator.rng.choice(["personal", "trabajo", "casa"]),
+                       "number": f"+519{generator.rng.randrange(10 ** 8):08d}"}
+                      for _ in range(generator.rng.randint(1, 3))]
+            file.write(json.dumps({
+                "name": f"{first_name} {last_name}",
+                "age": generator.rng.randint(18, 65),
+                "email": f"{first_name.lower()}.{last_name.lower()}{index}@example.com",
+                "address": {"street": f"Calle {generator.name()} #{generator.rng.randint(1, 9999)}",
+                            "city": generator.city(), "zip": f"{generator.rng.randint(1, 999):03d}"},
+                "phone_numbers": phones,
+            }, ensure_ascii=False) + "\n")
+    return path
+
+
+# Une los archivos de cada shard en orden para que la salida sea determinística
+def concatenate(parts: List[str], output: str) -> None:
+    with open(output, "wb") as destination:
+        for part in parts:
+            with open(part, "rb") as source:
+                shutil.copyfileobj(source, destination)
+            os.remove(part)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--seed", type=int, default=42)
+    common.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    common.add_argument("--city-skew", type=float, default=1.0)
+    common.add_argument("--name-length", default="3-10")
+
+    db_parser = subparsers.add_parser("db", parents=[common], help="Cargar users y products en la BD")
+    db_parser.add_argument("--users", type=int, default=100000)
+    db_parser.add_argument("--products", default="poisson:5")
+    db_parser.add_argument("--database-url", help="Por defecto la BD configurada en .env / DATABASE_URL")
+    db_parser.add_argument("--password", default="bench-password", help="Contraseña de todos los usuarios")
+    db_parser.add_argument("--recreate", action="store_true", help="Borrar y crear las tablas antes de cargar")
+    db_parser.add_argument("--run", default=uuid.uuid4().hex[:8],
+                           help="Etiqueta de la carga (prefijo de los username); aleatoria por defecto")
+
+    for name, help_text in (("users", "Usuarios UserA en NDJSON"), ("employees", "Empleados en NDJSON")):
+        ndjson_parser = subparsers.add_parser(name, parents=[common], help=help_text)
+        ndjson_parser.add_argument("--count", type=int, default=100000)
+        ndjson_parser.add_argument("--output", required=True)
+
+    args = parser.parse_args()
+
+    if args.command == "db":
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        # Se importa después de configurar DATABASE_URL
+        from app.v1.model.model import Base
+        from app.v1.utils.db import get_engine, get_password_hash
+
+        engine = get_engine()
+        args.database_url = engine.url.render_as_string(hide_password=False)
+        if args.recreate:
+            Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        # bcrypt es costoso: todos los usuarios comparten el hash de la misma contraseña
+        args.hashed_password = get_password_hash(args.password)
+        tasks = [(args, *shard) for shard in shard_ranges(args.users)]
+        users = products = 0
+        with Pool(args.workers) as pool:
+            if engine.dialect.name == "sqlite":
+                # SQLite admite un solo escritor: los procesos generan las filas y este proceso las inserta
+                for shard_users, shard_products in pool.imap(generate_shard, tasks):
+                    insert_rows(engine, shard_users, shard_products)
+                    users += len(shard_users)
+                    products += len(shard_products)
+            else:
+                for loaded_users, loaded_products in pool.imap_unordered(load_shard, tasks):
+                    users += loaded_users
+                    products += loaded_products
+        print(f"Cargados {users} usuarios y {products} productos (--run {args.run})")
+    else:
+        writer = write_users_shard if args.command == "users" else write_employees_shard
+        tasks = [(args, *shard) for shard in shard_ranges(args.count)]
+        with Pool(args.workers) as pool:
+            parts = pool.map(writer, tasks)
+        concatenate(parts, args.output)
+        print(f"Escritos {args.count} documentos en {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,264 @@
+"""
+Prueba de carga de extremo a extremo de la API
+
+Levanta la app contra una BD de prueba (SQLite por defecto, o la que se indique en --database-url,
+ej: un Postgres local), carga datos de ejemplo y mide para cada ruta el throughput y los percentiles
+p50/p95/p99 con 'concurrency' clientes simultáneos:
+    token, all_users, user, create_product, memory_users
+
+Modos:
+    --mode asgi     llama a la app en el mismo proceso (sin red); útil para comparar cambios de código
+    --mode uvicorn  inicia uvicorn en un puerto local y envía peticiones HTTP reales
+
+Los resultados se pueden guardar como línea base (--save-baseline) y las siguientes ejecuciones se
+comparan contra ella: si una ruta empeora más que --tolerance el proceso termina con código 1.
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.load_test --users 1000 --requests 300 --concurrency 8 --save-baseline
+    python -m benchmarks.load_test --users 1000 --requests 300 --concurrency 8
+"""
+import argparse
+import asyncio
+import http.client
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from urllib.parse import urlencode
+
+BASELINE_DIR = Path(__file__).parent / "baselines"
+BENCH_USERNAME = "bench"
+BENCH_PASSWORD = "bench-password"
+
+
+# Carga usuarios y productos con INSERT multi-fila. Todos comparten el hash de la misma contraseña
+# para no pagar bcrypt por cada usuario
+def seed(users: int, products_per_user: int, seed_value: int):
+    from app.v1.model.model import Base, User, Product
+    from app.v1.utils.db import SessionLocal, get_engine, get_password_hash
+    from sqlalchemy import insert
+
+    Base.metadata.drop_all(bind=get_engine())
+    Base.metadata.create_all(bind=get_engine())
+    rng = random.Random(seed_value)
+    hashed_password = get_password_hash(BENCH_PASSWORD)
+    user_rows = [{"id": uuid.UUID(int=rng.getrandbits(128), version=4), "first_name": f"Nombre{i}",
+                  "last_name": f"Apellido{i}", "city": rng.choice(["Lima", "Cusco", "Trujillo", "Arequipa"]),
+                  "username": f"user{i}", "hashed_password": hashed_password} for i in range(users)]
+    user_rows.append({"id": uuid.UUID(int=rng.getrandbits(128), version=4), "first_name": "Bench",
+                      "last_name": "Bench", "city": "Lima", "username": BENCH_USERNAME,
+                      "hashed_password": hashed_password})
+    product_rows = [{"name_product": f"Producto {j}", "price": round(rng.uniform(1, 500), 2), "owner_id": row["id"]}
+                    for row in user_rows for j in range(products_per_user)]
+    with SessionLocal() as session:
+        session.execute(insert(User), user_rows)
+        for start in range(0, len(product_rows), 10000):
+            session.execute(insert(Product), product_rows[start:start + 10000])
+        session.commit()
+    return [str(row["id"]) for row in user_rows]
+
+
+# Escenarios: cada uno devuelve (método, url, headers, cuerpo) para la siguiente petición
+def scenarios(user_ids, token: str, rng: random.Random):
+    auth = {"Authorization": f"Bearer {token}"}
+    form = urlencode({"username": BENCH_USERNAME, "password": BENCH_PASSWORD}).encode()
+    return {
+        "token": lambda: ("POST", "/token", {"Content-Type": "application/x-www-form-urlencoded"}, form),
+        "all_users": lambda: ("GET", "/all_users", auth, b""),
+        "user": lambda: ("GET", f"/user/{rng.choice(user_ids)}", auth, b""),
+        "create_product": lambda: ("POST", f"/users/{rng.choice(user_ids)}/products",
+                                   {**auth, "Content-Type": "application/json"},
+                                   json.dumps({"name_product": "Nuevo", "price": 9.9}).encode()),
+        "memory_users": lambda: ("GET", "/api/v1/users", {}, b""),
+    }
+
+
+def percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    index = min(len(sorted_values) - 1, max(0, round(q * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies, errors: int, elapsed: float) -> dict:
+    latencies = sorted(latencies)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "throughput_rps": round(len(latencies) / elapsed, 2),
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 3),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 3),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 3),
+    }
+
+
+async def run_asgi(app, next_request, requests: int, concurrency: int) -> dict:
+    from benchmarks.asgi_driver import request
+
+    remaining = requests
+    latencies, errors = [], 0
+
+    async def worker():
+        nonlocal remaining, errors
+        while remaining > 0:
+            remaining -= 1
+            method, url, headers, body = next_request()
+            start = time.perf_counter()
+            status, _, _ = await request(app, method, url, headers, body)
+            latencies.append(time.perf_counter() - start)
+            errors += status >= 400
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def run_http(port: int, next_request, requests: int, concurrency: int) -> dict:
+    remaining = requests
+    lock = threading.Lock()
+    latencies, errors = [], 0
+
+    def worker():
+        nonlocal remaining, errors
+        connection = http.client.HTTPConnection("127.0.0.1", port)
+        while True:
+            with lock:
+                if remaining <= 0:
+                    break
+                remaining -= 1
+                method, url, headers, body = next_request()
+            start = time.perf_counter()
+            connection.request(method, url, body=body or None, headers=headers)
+            response = connection.getresponse()
+            response.read()
+            elapsed = time.perf_counter() - start
+            with lock:
+                latencies.append(elapsed)
+                errors += response.status >= 400
+        connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(concurrency) as executor:
+        for future in [executor.submit(worker) for _ in range(concurrency)]:
+            future.result()
+    return summarize(latencies, errors, time.perf_counter() - start)
+
+
+def start_uvicorn(port: int) -> subprocess.Popen:
+    process = subprocess.Popen([sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level",
+                                "warning"], env=os.environ.copy())
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            socket.create_connection(("127.0.0.1", port), timeout=0.2).close()
+            return process
+        except OSError:
+            time.sleep(0.1)
+    process.kill()
+    raise RuntimeError("uvicorn no inició a tiempo")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+# Compara con la línea base: una ruta empeora si su p99 sube o su throughput baja más que 'tolerance'
+def compare(results: dict, baseline: dict, tolerance: float):
+    regressions = []
+    for route, current in results.items():
+        previous = baseline.get(route)
+        if previous is None:
+            continue
+        if current["p99_ms"] > previous["p99_ms"] * (1 + tolerance):
+            regressions.append(f"{route}: p99 {previous['p99_ms']} ms -> {current['p99_ms']} ms")
+        if current["throughput_rps"] < previous["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{route}: throughput {previous['throughput_rps']} -> {current['throughput_rps']} rps")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--mode", choices=("asgi", "uvicorn"), default="asgi")
+    parser.add_argument("--database-url", help="Por defecto una BD SQLite temporal")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--products", type=int, default=5, help="Productos por usuario")
+    parser.add_argument("--requests", type=int, default=200, help="Peticiones por ruta")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--routes", default="token,all_users,user,create_product,memory_users")
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--baseline", type=Path, help="Archivo de línea base (por defecto baselines/load_<modo>.json)")
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25)
+    parser.add_argument("--output", type=Path, help="Guardar los resultados en este archivo JSON")
+    args = parser.parse_args()
+
+    # La BD se configura antes de importar la app
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ["DATABASE_URL"] = args.database_url or f"sqlite:///{tmpdir.name}/bench.db"
+    # Sin rate limit: se mide la capacidad de las APIs, no las respuestas 429 (también vale para uvicorn)
+    os.environ.setdefault("RATE_LIMITS", "")
+    user_ids = seed(args.users, args.products, args.seed)
+    rng = random.Random(args.seed)
+    routes = [route.strip() for route in args.routes.split(",")]
+
+    results = {}
+    if args.mode == "asgi":
+        import main as app_module
+        from benchmarks.asgi_driver import request
+
+        async def run_all():
+            _, _, body = await request(app_module.app, "POST", "/token",
+                                       {"Content-Type": "application/x-www-form-urlencoded"},
+                                       urlencode({"username": BENCH_USERNAME, "password": BENCH_PASSWORD}).encode())
+            available = scenarios(user_ids, json.loads(body)["access_token"], rng)
+            for route in routes:
+                results[route] = await run_asgi(app_module.app, available[route], args.requests, args.concurrency)
+
+        asyncio.run(run_all())
+    else:
+        port = free_port()
+        process = start_uvicorn(port)
+        try:
+            connection = http.client.HTTPConnection("127.0.0.1", port)
+            connection.request("POST", "/token", urlencode({"username": BENCH_USERNAME, "password": BENCH_PASSWORD}),
+                               {"Content-Type": "application/x-www-form-urlencoded"})
+            token = json.loads(connection.getresponse().read())["access_token"]
+            available = scenarios(user_ids, token, rng)
+            for route in routes:
+                results[route] = run_http(port, available[route], args.requests, args.concurrency)
+        finally:
+            process.terminate()
+            process.wait()
+
+    print(f"{'ruta':<16}{'peticiones':>11}{'errores':>9}{'rps':>11}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for route, result in results.items():
+        print(f"{route:<16}{result['requests']:>11}{result['errors']:>9}{result['throughput_rps']:>11}"
+              f"{result['p50_ms']:>10}{result['p95_ms']:>10}{result['p99_ms']:>10}")
+    if args.output:
+        args.output.write_text(json.dumps(results, indent=2))
+
+    baseline_path = args.baseline or BASELINE_DIR / f"load_{args.mode}.json"
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(results, indent=2) + "\n")
+        print(f"Línea base guardada en {baseline_path}")
+    elif baseline_path.exists():
+        regressions = compare(results, json.loads(baseline_path.read_text()), args.tolerance)
+        if regressions:
+            print("Regresiones respecto a la línea base:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print(f"Sin regresiones respecto a {baseline_path}")
+
+
+if __name__ == "__main__":
+    main()
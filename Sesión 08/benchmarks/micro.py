@@ -0,0 +1,192 @@
+"""
+Microbenchmarks de las piezas básicas de la API
+
+- auth: get_password_hash / verify de bcrypt con distintos costos, create_access_token y jwt.decode
+- serialization: validación de UserOut a partir de objetos User del ORM (uno y una lista)
+- memory_db: búsqueda, actualización y eliminación en la BD en memoria (db_m) con 10^3 a 10^6 usuarios,
+  llamando a las mismas funciones de las APIs /api/v1/...
+
+La salida es un JSON con formato estable (schema_version 1) para poder seguir la tendencia entre
+ejecuciones; cada resultado tiene 'name', 'params', 'iterations', 'repeats' y los tiempos en segundos
+por operación ('mean_s', 'median_s', 'stdev_s', 'min_s') más 'ops_per_s'.
+
+Ejecutar desde la carpeta de la sesión:
+    python -m benchmarks.micro --output micro.json
+    python -m benchmarks.micro --only memory_db --sizes 1000,10000,100000,1000000
+"""
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+
+SCHEMA_VERSION = 1
+
+
+# Ejecuta 'func' las veces necesarias para que cada repetición dure al menos 'min_time' segundos
+# y devuelve las estadísticas por operación. 'setup' se ejecuta antes de cada repetición; 'setup_each'
+# antes de cada llamada y fuera del tiempo medido (para operaciones que cambian el estado, como delete)
+def measure(name: str, params: dict, func, repeats: int = 5, min_time: float = 0.2, setup=None,
+            setup_each=None) -> dict:
+    def run(iterations: int) -> float:
+        if setup:
+            setup()
+        if setup_each is None:
+            start = time.perf_counter()
+            for _ in range(iterations):
+                func()
+            return time.perf_counter() - start
+        elapsed = 0.0
+        for _ in range(iterations):
+            setup_each()
+            start = time.perf_counter()
+            func()
+            elapsed += time.perf_counter() - start
+        return elapsed
+
+    iterations = 1
+    while True:
+        elapsed = run(iterations)
+        if elapsed >= min_time or iterations >= 1 << 20:
+            break
+        iterations *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    timings = [run(iterations) / iterations for _ in range(repeats)]
+    result = {
+        "name": name,
+        "params": params,
+        "iterations": iterations,
+        "repeats": repeats,
+        "mean_s": statistics.mean(timings),
+        "median_s": statistics.median(timings),
+        "stdev_s": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "min_s": min(timings),
+        "ops_per_s": 1 / statistics.median(timings),
+    }
+    print(f"{name:<28} {json.dumps(params):<34} {result['median_s'] * 1e6:14.2f} µs/op", file=sys.stderr)
+    return result
+
+
+def bench_auth(bcrypt_rounds):
+    from passlib.context import CryptContext
+    from jose import jwt
+    from app.v1.utils.db import create_access_token, SECRET_KEY, ALGORITHM
+
+    results = []
+    for rounds in bcrypt_rounds:
+        context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=rounds)
+        hashed = context.hash("contraseña-de-prueba")
+        results.append(measure("bcrypt.hash", {"rounds": rounds}, lambda: context.hash("contraseña-de-prueba"),
+                               repeats=3, min_time=0.05))
+        results.append(measure("bcrypt.verify", {"rounds": rounds},
+                               lambda: context.verify("contraseña-de-prueba", hashed), repeats=3, min_time=0.05))
+
+    token = create_access_token({"sub": "usuario"})
+    results.append(measure("jwt.create_access_token", {"algorithm": ALGORITHM},
+                           lambda: create_access_token({"sub": "usuario"})))
+    results.append(measure("jwt.decode", {"algorithm": ALGORITHM},
+                           lambda: jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])))
+    return results
+
+
+def bench_serialization(list_size: int, products: int):
+    from app.v1.model.model import User, Product
+    from app.v1.schema.schemas import UserOut, user_out_list_adapter
+
+    def make_user(i):
+        return User(id=uuid.uuid4(), first_name=f"Nombre{i}", last_name=f"Apellido{i}", city="Lima",
+                    username=f"usuario{i}", hashed_password="$2b$12$" + "x" * 53,
+                    products=[Product(id=i * products + j, name_product=f"Producto {j}", price=9.9)
+                              for j in range(products)])
+
+    user = make_user(0)
+    users = [make_user(i) for i in range(list_size)]
+    return [
+        measure("UserOut.model_validate", {"products": products}, lambda: UserOut.model_validate(user)),
+        measure("UserOut.validate_list", {"users": list_size, "products": products},
+                lambda: user_out_list_adapter.validate_python(users, from_attributes=True), repeats=3),
+        measure("UserOut.validate_dump_json", {"users": list_size, "products": products},
+                lambda: user_out_list_adapter.dump_json(
+                    user_out_list_adapter.validate_python(users, from_attributes=True)), repeats=3),
+    ]
+
+
+def bench_memory_db(sizes):
+    from app.v1.routers import in_memory
+
+    update_user = in_memory.update_user
+    delete_user = in_memory.delete_user
+    original = list(in_memory.db_m)
+
+    results = []
+    for size in sizes:
+        users = [in_memory.UserA(id=uuid.uuid4(), first_name=f"Nombre{i}", last_name=f"Apellido{i}", city="Lima",
+                                 roles=[in_memory.Role.user]) for i in range(size)]
+        last_id = users[-1].id
+        change = in_memory.UpdateUser(first_name="Nuevo", last_name=None, roles=None)
+
+        def reset():
+            in_memory.db_m[:] = users
+
+        reset()
+        # Peor caso: el usuario buscado está al final de la lista
+        results.append(measure("db_m.scan", {"records": size},
+                               lambda: next(user for user in in_memory.db_m if user.id == last_id), repeats=3))
+        results.append(measure("db_m.update", {"records": size}, lambda: update_user(last_id, change), repeats=3))
+        # Cada delete elimina de verdad al último usuario: antes de cada llamada (fuera del tiempo medido)
+        # se vuelve a agregar al final, así no se mide la búsqueda de un id que ya no existe
+        def restore_last():
+            if in_memory.db_m[-1].id != last_id:
+                in_memory.db_m.append(users[-1])
+
+        results.append(measure("db_m.delete", {"records": size}, lambda: delete_user(last_id), repeats=3,
+                               setup=reset, setup_each=restore_last))
+    in_memory.db_m[:] = original
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=("auth", "serialization", "memory_db"), action="append")
+    parser.add_argument("--bcrypt-rounds", default="4,8,10,12")
+    parser.add_argument("--sizes", default="1000,10000,100000", help="Tamaños de db_m (hasta 1000000)")
+    parser.add_argument("--list-size", type=int, default=1000, help="Usuarios en la lista a serializar")
+    parser.add_argument("--products", type=int, default=3, help="Productos por usuario")
+    parser.add_argument("--output", help="Archivo JSON de salida (por defecto se imprime)")
+    args = parser.parse_args()
+
+    # La app se importa con una BD SQLite temporal para no depender de Postgres
+    tmpdir = tempfile.TemporaryDirectory()
+    os.environ.setdefault("DATABASE_URL", f"sqlite:///{tmpdir.name}/micro.db")
+
+    groups = args.only or ["auth", "serialization", "memory_db"]
+    results = []
+    if "auth" in groups:
+        results += bench_auth([int(rounds) for rounds in args.bcrypt_rounds.split(",")])
+    if "serialization" in groups:
+        results += bench_serialization(args.list_size, args.products)
+    if "memory_db" in groups:
+        results += bench_memory_db([int(size) for size in args.sizes.split(",")])
+
+    report = {
+        "schema_version": SCHEMA_VERSION,
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+
+if __name__ == "__main__":
+    main()
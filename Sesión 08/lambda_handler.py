@@ -0,0 +1,45 @@
+"""
+Punto de entrada para AWS Lambda (API Gateway / Function URL) usando Mangum.
+
+Handler de la función: lambda_handler.handler
+
+Para que el cold start sea rápido:
+- La app no se conecta a la BD al importarse: el engine se crea con la primera petición y se reutiliza
+  en las invocaciones "warm" siguientes (ver get_engine en app/v1/utils/db.py)
+- passlib (bcrypt) y jose se importan recién cuando se usan
+- No se crean las tablas ni se inicia el monitor del event loop al iniciar (en Lambda el proceso se
+  congela entre invocaciones)
+- Con DB_POOL_SIZE=1 cada contenedor mantiene una sola conexión, ya que atiende una petición a la vez
+
+Con IMPORT_TRACE=1 se registra cuánto tardó la inicialización y qué módulos pesados se cargaron. Para
+el detalle de cada import usar la variable de entorno PYTHONPROFILEIMPORTTIME=1 (equivale a -X importtime).
+"""
+import os
+import time
+
+_init_start = time.perf_counter()
+
+os.environ.setdefault("CREATE_TABLES_ON_STARTUP", "false")
+os.environ.setdefault("LOOP_MONITOR_ENABLED", "false")
+os.environ.setdefault("DB_POOL_SIZE", "1")
+os.environ.setdefault("DB_MAX_OVERFLOW", "0")
+
+import logging
+import sys
+
+from mangum import Mangum
+
+from main import app
+
+handler = Mangum(app, lifespan="auto")
+
+INIT_SECONDS = time.perf_counter() - _init_start
+
+# Módulos que se importan de forma diferida; no deberían aparecer después del cold start
+DEFERRED_MODULES = ("passlib", "jose", "psycopg2", "bcrypt")
+
+if os.getenv("IMPORT_TRACE", "").lower() in ("1", "true"):
+    logging.getLogger("app.lambda").warning(
+        "Inicialización en %.1f ms; módulos diferidos ya cargados: %s", INIT_SECONDS * 1000,
+        ", ".join(name for name in DEFERRED_MODULES if name in sys.modules) or "ninguno",
+    )
@@ -1,199 +1,86 @@
-import time
-from fastapi import FastAPI, Depends, HTTPException, status, Request
-from pydantic import BaseModel
-from typing import Optional, List
-from uuid import UUID, uuid4
-from enum import Enum
-
-from sqlalchemy.orm import Session
-from app.v1.utils.db import get_db, authenticate_user, create_access_token, get_password_hash, get_current_user
-from app.v1.model.model import User, Product
-from app.v1.schema.schemas import UserCreate, UserOut, Token, ProductCreate, ProductOut
-
-from fastapi.security import OAuth2PasswordRequestForm
+# Se importa primero: mide el arranque desde aquí (ver /admin/startup)
+from app.v1.utils import startup
+
+from fastapi import FastAPI
+from contextlib import asynccontextmanager
+
+from fastapi.concurrency import run_in_threadpool
+from app.v1.utils.responses import NegotiatedJSONResponse
+from app.v1.utils.routing import NegotiatedRoute
+from app.v1.utils.config import settings
+from app.v1.middleware.compression import CompressionMiddleware
+from app.v1.middleware.concurrency import AdaptiveConcurrencyMiddleware
+from app.v1.middleware.idempotency import IdempotencyMiddleware
+from app.v1.utils.idempotency import create_idempotency_store, parse_routes
+from app.v1.middleware.rate_limit import RateLimitMiddleware
+from app.v1.utils.rate_limit import create_store, parse_rules
+from app.v1.middleware.timing import ProcessTimeMiddleware
+
+
+# Tareas que se ejecutan al iniciar y al detener la aplicación
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.create_tables_on_startup:
+        from app.v1.utils.db import create_tables
+        await run_in_threadpool(create_tables)
+    # Mide continuamente el retraso del event loop y registra qué código lo bloqueó
+    monitor = None
+    if settings.loop_monitor_enabled:
+        from app.v1.utils.loop_monitor import LoopLagMonitor
+        monitor = LoopLagMonitor(interval=settings.loop_lag_interval_ms / 1000,
+                                 threshold=settings.loop_lag_threshold_ms / 1000)
+        monitor.start()
+    startup.mark("ready")
+    yield
+    if monitor is not None:
+        await monitor.stop()
 
 
 # Instanciamos la clase FastAPI
-app = FastAPI()
-
-
-# Modelos que se usarán para interactuar para la B.D. en memoria
-class Post(BaseModel):
-    author: str
-    title: str
-    content: str
-    tags: str
-
-
-class Role(str, Enum):
-    admin = "admin"
-    user = "user"
-
-
-class UserA(BaseModel):
-    id: Optional[UUID] = uuid4()
-    first_name: str
-    last_name: str
-    city: str
-    roles: List[Role]
-
-
-class UpdateUser(BaseModel):
-    first_name: Optional[str]
-    last_name: Optional[str]
-    roles: Optional[List[Role]]
-
-
-# Creamos APIs que afectarán a la BD en memoria que tenemos líneas abajo (db_m)
-@app.get("/")
-async def root():
-    return {"name": "Carolina Gutierrez", "city": "Lima", "age": 24}
-
-
-@app.get('/posts/{id}')
-def getPost(id):
-    return {"data": id}
-
-
-@app.post('/posts')
-def addPost(post: Post):
-    return {"message": f"The post {post.title} has been added"}
-
-
-@app.get("/api/v1/users")
-def get_users():
-    return db_m
-
-
-@app.post("/api/v1/users")
-def create_user(user: UserA):
-    db_m.append(user)
-    return {"id": user.id}
-
-
-@app.delete("/api/v1/users/{id}")
-def delete_user(id: UUID):
-    for user in db_m:
-        if user.id == id:
-            db_m.remove(user)
-            return
-
-
-@app.put("/api/v1/user/{id}")
-def update_user(id: UUID, user_update: UpdateUser):
-    for user in db_m:
-        if user.id == id:
-            if user_update.first_name is not None:
-                user.first_name = user_update.first_name
-            if user_update.last_name is not None:
-                user.last_name = user_update.last_name
-            if user_update.roles is not None:
-                user.roles = user_update.roles
-        return user.id
-
+# Las respuestas se envían en JSON o en MessagePack según el header Accept (ver NegotiatedRoute)
+app = FastAPI(default_response_class=NegotiatedJSONResponse, lifespan=lifespan)
+app.router.route_class = NegotiatedRoute
+
+# Guarda la respuesta de las APIs que crean recursos y la repite si el cliente reintenta con la misma
+# Idempotency-Key (ver middleware/idempotency.py). Va dentro de la compresión para guardar el cuerpo original
+idempotent_routes = parse_routes(settings.idempotent_routes)
+if idempotent_routes:
+    app.add_middleware(IdempotencyMiddleware, routes=idempotent_routes,
+                       store=create_idempotency_store(settings.idempotency_store),
+                       ttl=settings.idempotency_ttl_seconds, lock_ttl=settings.idempotency_lock_ttl_seconds)
+# Comprime las respuestas grandes (ej: /all_users) según el header Accept-Encoding del cliente
+app.add_middleware(CompressionMiddleware, minimum_size=settings.compression_min_size,
+                   offload_size=settings.compression_offload_size)
+# Limita cuántas peticiones se atienden a la vez según la latencia observada y responde 503 cuando la
+# cola de espera se llena, en lugar de dejar que se acumulen en el threadpool y en el pool de la BD
+if settings.concurrency_limit_enabled:
+    app.add_middleware(AdaptiveConcurrencyMiddleware, initial_limit=settings.concurrency_initial_limit,
+                       min_limit=settings.concurrency_min_limit, max_limit=settings.concurrency_max_limit,
+                       latency_tolerance=settings.concurrency_latency_tolerance,
+                       latency_slack=settings.concurrency_latency_slack_ms / 1000,
+                       queue_size=settings.concurrency_queue_size,
+                       queue_timeout=settings.concurrency_queue_timeout_ms / 1000,
+                       exempt_paths=[path for path in settings.concurrency_exempt_paths.split(",") if path])
+# Rate limit por cliente y por ruta para las APIs más costosas (bcrypt en /token, tabla completa en
+# /all_users). Va antes del límite de concurrencia para que las peticiones rechazadas no ocupen lugar
+rate_limit_rules = parse_rules(settings.rate_limits)
+if rate_limit_rules:
+    app.add_middleware(RateLimitMiddleware, rules=rate_limit_rules, store=create_store(settings.rate_limit_store))
+# Middleware que agrega un campo personalizado a la cabecera de las respuestas y el tiempo de ejecución
+# de las APIs en "X-process-Time"; el tiempo también se registra en el histograma de /metrics.
+# Se agrega al final para que sea el más externo y mida también la compresión
+app.add_middleware(ProcessTimeMiddleware, headers={"X-hi-name": "Hi Carol welcome!"})
+
+
+# Routers de la aplicación (app/v1/routers). Se importan aquí con importlib, solo los indicados en
+# APP_ROUTERS (todos por defecto): un proceso que atiende solo algunos grupos de rutas no paga el import
+# del resto. El tiempo de cada import queda en /admin/startup (ver benchmarks/bench_startup.py)
+ROUTERS = ("in_memory", "admin", "auth", "users", "products", "employees")
+
+for name in settings.app_routers.split(",") if settings.app_routers else ROUTERS:
+    app.include_router(startup.import_router(f"app.v1.routers.{name.strip()}"))
+startup.mark("import")
 
-# Middleware que agregará un campo personalizado a la cabecerá de las peticiones de las APIs
-@app.middleware("http")
-async def add_custom_header(request: Request, call_next):
-    response = await call_next(Request)
-    response.headers["X-hi-name"] = "Hi Carol welcome!"
-
-    return response
-
-
-# Middleware que nos dará el tiempo de ejecución de las APIs y se estará agregando en el header
-# con el nombre de "X-process-Time"
-@app.middleware("http")
-async def add_process_time_header(request: Request, call_next):
-
-    start_time = time.time()
-    # Se ejecutará "add_process_time_header" en el middleware y la API se ejecutará con la ruta coincidente
-    response = await call_next(request)
-
-    process_time = time.time() - start_time
-    # Añadimos el tiempo en la cabecera de la respuesta
-    response.headers["X-process-Time"] = str(process_time)
-    print("Tiempo de procedimiento: {}".format(process_time))
-    return response
-
-
-# Esta función nos ayudará a autenticar a un usuario mediante su usuario y contraseña
-@app.post("/token", response_model=Token)
-def login_for_access_token(form_data: OAuth2PasswordRequestForm = Depends(), db: Session = Depends(get_db)):
-    user = authenticate_user(db, form_data.username, form_data.password)
-    if not user:
-        raise HTTPException(
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            detail="Usuario o password incorrecto",
-            headers={"WWW-Authenticate": "Bearer"},
-        )
-
-    access_token = create_access_token(
-        data={"sub": form_data.username}
-    )
-    return {"access_token": access_token, "token_type": "bearer"}
-
-
-@app.post("/new_user/", response_model=UserOut)
-def create_new_user(user: UserCreate, db: Session = Depends(get_db)):
-    hashed_password = get_password_hash(user.hashed_password)
-    new_user = User(first_name=user.first_name, last_name=user.last_name, city=user.city,
-                    username=user.username, hashed_password=hashed_password)
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-    return new_user
-
-
-# API protegida por el token
-@app.get("/all_users", response_model=List[UserOut], dependencies=[Depends(get_current_user)])
-def list_users(session: Session = Depends(get_db)):
-    list_user = session.query(User).all()   # Obtenemos todos los usuarios de la tabla en la BD
-    return list_user
-
-
-# API protegida por el token
-@app.get("/user/{id}", response_model=UserOut, dependencies=[Depends(get_current_user)])
-def read_user(id: UUID, session: Session = Depends(get_db)):
-    user = session.query(User).get(id)
-    # Verificar si el id existe. Si no, devolver respuesta 404 Not found
-    if not user:
-        raise HTTPException(status_code=404, detail=f"Usuario con id {id} no se encuentra en la BD")
-    return user
-
-
-@app.put("/user/{id}", response_model=UserOut, dependencies=[Depends(get_current_user)])
-def update_user(id: UUID, user_update: UserCreate, session: Session = Depends(get_db)):
-    user = session.query(User).get(id)  # Obtenemos el usuario de la BD
-    if user:
-        user.first_name = user_update.first_name
-        user.last_name = user_update.last_name
-        user.city = user_update.city
-        session.commit()
-    if not user:
-        raise HTTPException(status_code=404, detail=f"Usuario con id {id} no fue encontrado para poder actualizarlo")
-    return user
-
-
-@app.delete("/user/{id}", status_code=status.HTTP_204_NO_CONTENT)
-def delete_user(id: UUID, session: Session = Depends(get_db)):
-
-    user = session.query(User).get(id)  # Obtenemos el usuario de la BD
-    if user:
-        session.delete(user)
-        session.commit()
-    if not user:
-        raise HTTPException(status_code=404, detail=f"Usuario con el id {id} no fue encontrado")
-    return user
-
-
-@app.post("/users/{user_id}/products", response_model=ProductOut)
-def create_product_for_user(user_id:UUID, product: ProductCreate, session: Session = Depends(get_db)):
-    product = Product(**product.dict(), owner_id=user_id)
-    session.add(product)
-    session.commit()
-    session.refresh(product)
-    return product
 
 """
 Configuración personalizada de OpenAPI:
@@ -233,38 +120,3 @@ para ciertas APIs necesiten el ingreso de Token Bearer luego que la obtenemos de
 #
 #
 # app.openapi = custom_openapi
-
-
-#Creamos una Base de Datos en memoria
-db_m: List[UserA] = [
-    UserA(
-        id=uuid4(),
-        first_name="Freddy",
-        last_name="Nolasco",
-        city="Lima",
-        roles=[Role.user],
-    ),
-    UserA(
-        id=uuid4(),
-        first_name="Juana",
-        last_name="Falcón",
-        city="Trujillo",
-        roles=[Role.admin],
-    ),
-    UserA(
-        id=uuid4(),
-        first_name="Noelia",
-        last_name="Perez",
-        city="Lima",
-        roles=[Role.user],
-    ),
-    UserA(
-        id=uuid4(),
-        first_name="Edwin",
-        last_name="Deza",
-        city="Cusco",
-        roles=[Role.admin, Role.user],
-    ),
-]
-
-
@@ -0,0 +1,322 @@
+"""
+Lanzador de la API con varios workers (reemplaza a "uvicorn main:app" en producción)
+
+- Número de workers: WEB_CONCURRENCY o --workers; si no se indica se usa un worker por CPU disponible,
+  contando la afinidad del proceso y la cuota de CPU del cgroup (Docker/Kubernetes con límite de CPU).
+  Cada worker es un proceso uvicorn con su propio event loop
+- La app se importa una sola vez en el proceso principal y luego se hace fork de los workers (preload):
+  los workers arrancan más rápido y comparten en memoria el código ya importado
+- El pool de conexiones de cada worker se ajusta para que la suma de todos no pase de max_connections
+  de Postgres (DB_MAX_CONNECTIONS o, si no se indica, lo que responda "SHOW max_connections") menos
+  DB_RESERVED_CONNECTIONS, que quedan libres para migraciones, psql, etc. Se reparte entre un worker más
+  de los configurados, porque durante una recarga conviven los workers actuales y uno nuevo
+- Las tablas se crean una vez en el proceso principal (CREATE_TABLES_ON_STARTUP) y no en cada worker
+- Si un worker termina inesperadamente se reemplaza por otro
+- SIGTERM/SIGINT detienen los workers esperando a que terminen las peticiones en curso
+- SIGHUP recarga sin cortar el servicio: se verifica que el código nuevo se pueda importar y el proceso
+  principal se vuelve a ejecutar (exec) conservando el socket y los workers se reemplazan de a uno: se
+  inicia uno nuevo, cuando está listo se detiene uno anterior con SIGTERM y se espera a que termine
+
+Cada worker tiene sus propias métricas: /metrics muestra las del worker que atendió la petición.
+
+Ejecutar desde la carpeta de la sesión:
+    python serve.py --host 0.0.0.0 --port 8000
+    python serve.py --check     # solo muestra los workers y el pool por worker calculados
+    kill -HUP <pid>             # recarga
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+from typing import Optional
+
+from app.v1.utils.config import settings
+from app.v1.utils.rate_limit import REDIS_URL_PREFIXES
+
+logger = logging.getLogger("app.serve")
+
+# Variables de entorno con las que el proceso principal se pasa el estado a sí mismo al recargar (exec)
+LISTEN_FD_ENV = "SERVE_LISTEN_FD"
+OLD_WORKERS_ENV = "SERVE_OLD_WORKERS"
+
+
+# Cuota de CPU del cgroup en número de CPUs (ej: 1.5), o None si no hay límite
+def cgroup_cpu_quota() -> Optional[float]:
+    try:
+        # cgroup v2: "max 100000" o "150000 100000"
+        with open("/sys/fs/cgroup/cpu.max") as file:
+            quota, period = file.read().split()
+        return None if quota == "max" else int(quota) / int(period)
+    except (OSError, ValueError):
+        pass
+    try:
+        # cgroup v1: la cuota es -1 si no hay límite
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as file:
+            quota = int(file.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as file:
+            period = int(file.read())
+        return None if quota <= 0 else quota / period
+    except (OSError, ValueError):
+        return None
+
+
+def available_cpus() -> float:
+    cpus = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    return min(cpus, quota) if quota else cpus
+
+
+# Un worker por CPU: uvicorn es asíncrono, más procesos que CPUs solo agregan cambios de contexto
+# (y con una cuota fraccionada, ej: 1.5, se redondea para no quedar limitados por el cgroup)
+def default_workers() -> int:
+    return max(1, round(available_cpus()))
+
+
+# Consulta max_connections en Postgres con una conexión que se cierra enseguida (no se usa el engine de
+# la app para no abrir su pool antes del fork)
+def detect_max_connections(url: str) -> Optional[int]:
+    from sqlalchemy import create_engine, text
+    from sqlalchemy.pool import NullPool
+
+    engine = create_engine(url, poolclass=NullPool)
+    try:
+        with engine.connect() as connection:
+            return int(connection.execute(text("SHOW max_connections")).scalar())
+    except Exception as exc:
+        logger.warning("No se pudo consultar max_connections: %s", exc)
+        return None
+    finally:
+        engine.dispose()
+
+
+# Reparte las conexiones disponibles entre los workers: cada uno recibe como máximo su parte, primero
+# como pool_size (conexiones que se mantienen abiertas) y el resto como max_overflow
+def pool_per_worker(workers: int, max_connections: int, reserved: int, pool_size: int, max_overflow: int):
+    per_worker = (max_connections - reserved) // workers
+    if per_worker < 1:
+        raise SystemExit(f"{workers} workers no caben en {max_connections} conexiones "
+                         f"({reserved} reservadas); reduzca WEB_CONCURRENCY")
+    size = min(pool_size, per_worker)
+    return size, min(max_overflow, per_worker - size)
+
+
+def configure_pools(workers: int) -> Optional[dict]:
+    if settings.db_url.startswith("sqlite"):
+        return None
+    max_connections = settings.db_max_connections or detect_max_connections(settings.db_url) or 100
+    # Un worker más: en una recarga el worker nuevo arranca antes de que se detenga el anterior
+    size, overflow = pool_per_worker(workers + 1, max_connections, settings.db_reserved_connections,
+                                     settings.db_pool_size, settings.db_max_overflow)
+    # El engine se crea en cada worker (get_engine) y lee estos valores; se exportan también para el exec
+    settings.db_pool_size, settings.db_max_overflow = size, overflow
+    os.environ["DB_POOL_SIZE"], os.environ["DB_MAX_OVERFLOW"] = str(size), str(overflow)
+    return {"max_connections": max_connections, "pool_size": size, "max_overflow": overflow,
+            "total": (workers + 1) * (size + overflow)}
+
+
+def listen_socket(host: str, port: int, backlog: int) -> socket.socket:
+    inherited = os.environ.pop(LISTEN_FD_ENV, None)
+    if inherited is not None:
+        sock = socket.socket(fileno=int(inherited))
+    else:
+        sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        sock.bind((host, port))
+        sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers: int, args):
+        self.app = app
+        self.sock = sock
+        self.workers = workers
+        self.args = args
+        self.children = {}      # pid -> descriptor de lectura del pipe de "listo"
+        self.signal = None
+
+    def handle_signal(self, sig, frame):
+        self.signal = sig
+
+    # Proceso hijo: restaura las señales y atiende peticiones con uvicorn sobre el socket compartido
+    def run_worker(self, ready_fd: int):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, signal.SIG_DFL)
+        for fd in self.children.values():
+            os.close(fd)
+        import asyncio
+        import uvicorn
+        from app.v1.utils.db import get_engine
+
+        # Por si el engine se creó antes del fork: sus conexiones no se pueden compartir entre procesos
+        if get_engine.cache_info().currsize:
+            get_engine().dispose(close=False)
+        config = uvicorn.Config(self.app, log_level=self.args.log_level, proxy_headers=True,
+                                timeout_graceful_shutdown=self.args.graceful_timeout)
+        server = uvicorn.Server(config)
+
+        async def serve():
+            task = asyncio.create_task(server.serve(sockets=[self.sock]))
+            while not server.started and not task.done():
+                await asyncio.sleep(0.05)
+            if server.started:
+                os.write(ready_fd, b"1")
+            os.close(ready_fd)
+            await task
+
+        try:
+            asyncio.run(serve())
+        finally:
+            os._exit(0 if server.started else 3)
+
+    def spawn(self) -> int:
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            self.run_worker(write_fd)
+        os.close(write_fd)
+        os.set_blocking(read_fd, False)
+        self.children[pid] = read_fd
+        return pid
+
+    # Espera a que los workers indicados terminen el arranque (lifespan) y empiecen a aceptar conexiones
+    def wait_ready(self, pids, timeout: float) -> bool:
+        deadline = time.monotonic() + timeout
+        pending, ready = set(pids), 0
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                try:
+                    # Un byte si inició; vacío si el worker terminó antes de estar listo
+                    ready += len(os.read(self.children[pid], 1))
+                    pending.discard(pid)
+                except BlockingIOError:
+                    pass
+            time.sleep(0.05)
+        return ready == len(pids)
+
+    def stop(self, pids, sig=signal.SIGTERM):
+        for pid in pids:
+            try:
+                os.kill(pid, sig)
+            except ProcessLookupError:
+                pass
+
+    def reap(self, pids, timeout: float):
+        deadline = time.monotonic() + timeout
+        pending = set(pids)
+        while pending and time.monotonic() < deadline:
+            for pid in list(pending):
+                if os.waitpid(pid, os.WNOHANG)[0]:
+                    pending.discard(pid)
+            time.sleep(0.1)
+        self.stop(pending, signal.SIGKILL)
+        for pid in pending:
+            os.waitpid(pid, 0)
+
+    # Recarga: primero se comprueba en un proceso aparte que el código nuevo se pueda importar; si falla
+    # se siguen usando los workers actuales
+    def reload(self):
+        check = subprocess.run([sys.executable, "-c", "import main"], capture_output=True, text=True)
+        if check.returncode != 0:
+            logger.error("Recarga cancelada, el código nuevo no se pudo importar:\n%s", check.stderr)
+            return
+        logger.warning("Recargando: iniciando workers nuevos")
+        os.environ[LISTEN_FD_ENV] = str(self.sock.fileno())
+        os.environ[OLD_WORKERS_ENV] = ",".join(str(pid) for pid in self.children)
+        os.execv(sys.executable, [sys.executable] + sys.argv)
+
+    # Reemplaza los workers anteriores de a uno: inicia un worker nuevo, espera a que esté listo y detiene
+    # uno anterior. Nunca hay más de un worker extra (con su pool de conexiones) sobre los configurados,
+    # que es lo que reserva configure_pools
+    def replace(self, old_workers):
+        for index in range(max(len(old_workers), self.workers)):
+            if index < self.workers and not self.wait_ready([self.spawn()], self.args.startup_timeout):
+                logger.warning("Un worker nuevo no inició en %s s", self.args.startup_timeout)
+            if index < len(old_workers):
+                self.stop([old_workers[index]])
+                self.reap([old_workers[index]], self.args.graceful_timeout + 5)
+        logger.warning("Recarga completa: %s workers anteriores detenidos", len(old_workers))
+
+    def run(self):
+        for sig in (signal.SIGHUP, signal.SIGTERM, signal.SIGINT):
+            signal.signal(sig, self.handle_signal)
+
+        # Al venir de una recarga, los workers anteriores siguen atendiendo mientras se reemplazan
+        old_workers = [int(pid) for pid in os.environ.pop(OLD_WORKERS_ENV, "").split(",") if pid]
+        if old_workers:
+            self.replace(old_workers)
+        elif not self.wait_ready([self.spawn() for _ in range(self.workers)], self.args.startup_timeout):
+            logger.warning("Algunos workers no iniciaron en %s s", self.args.startup_timeout)
+
+        while True:
+            if self.signal == signal.SIGHUP:
+                self.signal = None
+                self.reload()
+            elif self.signal in (signal.SIGTERM, signal.SIGINT):
+                break
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                pid = 0
+            if pid and pid in self.children:
+                os.close(self.children.pop(pid))
+                logger.error("El worker %s terminó (estado %s); iniciando otro", pid, status)
+                # Si no llegó a iniciar (ej: la BD no responde) se espera un poco para no reiniciarlo en bucle
+                if os.waitstatus_to_exitcode(status) != 0:
+                    time.sleep(1)
+                self.spawn()
+            elif not pid:
+                time.sleep(0.2)
+
+        self.stop(self.children)
+        self.reap(self.children, self.args.graceful_timeout + 5)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=settings.web_concurrency or None,
+                        help="Por defecto WEB_CONCURRENCY o un worker por CPU disponible")
+    parser.add_argument("--backlog", type=int, default=2048)
+    parser.add_argument("--graceful-timeout", type=float, default=30,
+                        help="Segundos para terminar las peticiones en curso al detener un worker")
+    parser.add_argument("--startup-timeout", type=float, default=60)
+    parser.add_argument("--log-level", default="info")
+    parser.add_argument("--check", action="store_true", help="Mostrar la configuración calculada y salir")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(process)d] %(levelname)s %(message)s")
+
+    workers = args.workers or default_workers()
+    pools = configure_pools(workers)
+    logger.info("CPUs disponibles: %s, workers: %s", available_cpus(), workers)
+    if pools:
+        logger.info("max_connections: %(max_connections)s, por worker: pool_size=%(pool_size)s "
+                    "max_overflow=%(max_overflow)s, total máximo: %(total)s", pools)
+    # Los buckets del almacén en memoria son de cada worker: cada cliente podría hacer N veces las peticiones
+    if workers > 1 and settings.rate_limits.strip() and not settings.rate_limit_store.startswith(REDIS_URL_PREFIXES):
+        logger.warning("RATE_LIMITS usa el almacén en memoria: con %s workers el límite real es %s veces el "
+                       "configurado. Usar RATE_LIMIT_STORE=redis://... para compartirlo", workers, workers)
+    if args.check:
+        return
+
+    sock = listen_socket(args.host, args.port, args.backlog)
+    # Preload: la app (y todo lo que importa) se carga una vez antes del fork
+    from main import app
+    # Las tablas se crean una sola vez aquí y no en el lifespan de cada worker (se harían en paralelo)
+    if settings.create_tables_on_startup:
+        from app.v1.utils.db import create_tables, get_engine
+        create_tables()
+        get_engine().dispose()
+        settings.create_tables_on_startup = False
+    Master(app, sock, workers, args).run()
+
+
+if __name__ == "__main__":
+    main()
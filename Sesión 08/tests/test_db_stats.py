@@ -0,0 +1,70 @@
+"""
+Pruebas de las estadísticas de SQL por petición (app/v1/utils/db_stats.py) con SQLite en memoria
+
+Ejecutar desde la carpeta de la sesión:
+    python -m pytest -q tests
+"""
+import logging
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.exc import OperationalError
+
+from app.v1.utils import db_stats
+from app.v1.utils.db_stats import QueryBudgetExceeded, QueryStats, current_query_stats, query_budget
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine("sqlite://")
+    with engine.connect() as conn:
+        conn.execute(text("CREATE TABLE users (id INTEGER PRIMARY KEY, hashed_password TEXT)"))
+        yield conn
+    engine.dispose()
+
+
+@pytest.fixture
+def stats():
+    stats = QueryStats()
+    token = current_query_stats.set(stats)
+    yield stats
+    current_query_stats.reset(token)
+
+
+# Con QUERY_BUDGET_STRICT=true (tests) superar el presupuesto de la ruta hace fallar la petición
+def test_strict_query_budget_raises(conn, stats, monkeypatch):
+    monkeypatch.setattr(db_stats.settings, "query_budget_strict", True)
+    query_budget(2)()
+    conn.execute(text("SELECT 1"))
+    conn.execute(text("SELECT 2"))
+    with pytest.raises(QueryBudgetExceeded, match="presupuesto de 2 consultas"):
+        conn.execute(text("SELECT 3"))
+    assert conn.info["query_start"] == []
+
+
+def test_query_budget_only_warns_by_default(conn, stats, monkeypatch, caplog):
+    monkeypatch.setattr(db_stats.settings, "query_budget_strict", False)
+    query_budget(1)()
+    for _ in range(3):
+        conn.execute(text("SELECT 1"))
+    assert stats.statements == 3
+    assert [record.message for record in caplog.records if "presupuesto" in record.message][:1]
+
+
+# Una sentencia con error no deja su hora de inicio en la pila de la conexión
+def test_failed_statement_does_not_leak_start_time(conn, stats):
+    for _ in range(3):
+        with pytest.raises(OperationalError):
+            conn.execute(text("SELECT * FROM missing_table"))
+    assert conn.info["query_start"] == []
+    conn.execute(text("SELECT 1"))
+    assert stats.statements == 1
+
+
+def test_slow_query_log_omits_parameters(conn, monkeypatch, caplog):
+    monkeypatch.setattr(db_stats.settings, "slow_query_threshold_ms", 0)
+    with caplog.at_level(logging.WARNING, logger="app.db"):
+        conn.execute(text("SELECT id FROM users WHERE hashed_password = :hash"), {"hash": "$2b$12$secret"})
+    messages = [record.getMessage() for record in caplog.records if "Consulta lenta" in record.getMessage()]
+    assert messages and "hashed_password" in messages[0]
+    assert not any("$2b$12$secret" in message for message in messages)
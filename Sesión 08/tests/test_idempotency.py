@@ -0,0 +1,111 @@
+"""
+Pruebas del middleware de Idempotency-Key (app/v1/middleware/idempotency.py) con el almacén en memoria
+
+Se usa una app Starlette mínima que cuenta cuántas veces se ejecuta cada API. Ejecutar desde la carpeta
+de la sesión:
+    python -m pytest -q tests
+"""
+import asyncio
+
+import httpx
+import pytest
+from starlette.applications import Starlette
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+from app.v1.middleware.idempotency import IdempotencyMiddleware
+from app.v1.utils.idempotency import IdempotencyStore, InMemoryIdempotencyStore, parse_routes
+
+
+def make_app():
+    calls = {"create": 0, "fail": 0}
+    release = asyncio.Event()
+
+    async def create(request):
+        calls["create"] += 1
+        payload = await request.json()
+        if payload.get("wait"):
+            await release.wait()
+        return JSONResponse({"number": calls["create"], **payload}, status_code=201)
+
+    # Falla la primera vez y funciona en el reintento
+    async def fail(request):
+        calls["fail"] += 1
+        if calls["fail"] == 1:
+            return JSONResponse({"detail": "error"}, status_code=503)
+        return JSONResponse({"number": calls["fail"]}, status_code=201)
+
+    app = Starlette(routes=[Route("/items", create, methods=["POST"]), Route("/fail", fail, methods=["POST"])])
+    app = IdempotencyMiddleware(app, routes=parse_routes("POST /items;POST /fail"),
+                                store=InMemoryIdempotencyStore())
+    return app, calls, release
+
+
+def post(client, path, key, payload):
+    return client.post(path, json=payload, headers={"Idempotency-Key": key})
+
+
+def run(test):
+    app, calls, release = make_app()
+
+    async def main():
+        transport = httpx.ASGITransport(app=app, client=("10.0.0.1", 1234))
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            await test(client, calls, release)
+
+    asyncio.run(main())
+
+
+def test_same_key_replays_first_response():
+    async def test(client, calls, release):
+        first = await post(client, "/items", "k1", {"name": "a"})
+        retry = await post(client, "/items", "k1", {"name": "a"})
+        assert calls["create"] == 1
+        assert (first.status_code, first.json()) == (201, {"number": 1, "name": "a"})
+        assert (retry.status_code, retry.json()) == (first.status_code, first.json())
+        assert retry.headers["idempotent-replayed"] == "true"
+        assert "idempotent-replayed" not in first.headers
+        # Otra clave sí vuelve a ejecutar la API
+        assert (await post(client, "/items", "k2", {"name": "a"})).json()["number"] == 2
+
+    run(test)
+
+
+def test_same_key_with_different_body_is_rejected():
+    async def test(client, calls, release):
+        await post(client, "/items", "k1", {"name": "a"})
+        response = await post(client, "/items", "k1", {"name": "b"})
+        assert response.status_code == 422
+        assert calls["create"] == 1
+
+    run(test)
+
+
+def test_retry_while_first_request_in_flight_gets_409():
+    async def test(client, calls, release):
+        first = asyncio.ensure_future(post(client, "/items", "k1", {"wait": True}))
+        while calls["create"] == 0:
+            await asyncio.sleep(0.01)
+        retry = await post(client, "/items", "k1", {"wait": True})
+        assert retry.status_code == 409
+        assert retry.headers["retry-after"] == "1"
+        release.set()
+        assert (await first).status_code == 201
+        assert calls["create"] == 1
+
+    run(test)
+
+
+def test_server_errors_are_not_stored():
+    async def test(client, calls, release):
+        assert (await post(client, "/fail", "k1", {})).status_code == 503
+        retry = await post(client, "/fail", "k1", {})
+        assert (retry.status_code, retry.json()) == (201, {"number": 2})
+        assert calls["fail"] == 2
+
+    run(test)
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        IdempotencyStore()
@@ -0,0 +1,53 @@
+"""
+Pruebas del parser JSON incremental de la ingesta de empleados (app/v1/utils/ingest.py)
+
+Ejecutar desde la carpeta de la sesión:
+    python -m pytest -q tests
+"""
+import json
+
+import pytest
+
+from app.v1.utils.ingest import IngestError, JSONStreamParser
+
+DOCUMENTS = [{"name": f"empleado {i}", "age": 20 + i % 40, "address": {"city": "Lima"}} for i in range(100)]
+
+
+def feed_in_chunks(parser: JSONStreamParser, data: bytes, size: int) -> list:
+    documents = []
+    for start in range(0, len(data), size):
+        documents.extend(parser.feed(data[start:start + size]))
+    documents.extend(parser.feed(b"", final=True))
+    return documents
+
+
+# Los cortes entre chunks caen en cualquier parte: justo después de una ',', dentro de un documento,
+# en medio de un carácter UTF-8 de varios bytes...
+@pytest.mark.parametrize("size", [1, 7, 50])
+def test_array_in_small_chunks(size):
+    data = json.dumps(DOCUMENTS + [{"name": "Ñandú"}], ensure_ascii=False).encode()
+    parser = JSONStreamParser()
+    assert feed_in_chunks(parser, data, size) == DOCUMENTS + [{"name": "Ñandú"}]
+    assert parser.count == len(DOCUMENTS) + 1
+
+
+@pytest.mark.parametrize("size", [1, 7, 50])
+def test_ndjson_in_small_chunks(size):
+    data = "\n".join(json.dumps(document) for document in DOCUMENTS).encode() + b"\n"
+    assert feed_in_chunks(JSONStreamParser(), data, size) == DOCUMENTS
+
+
+def test_array_without_closing_bracket():
+    with pytest.raises(IngestError, match="no se cerró"):
+        feed_in_chunks(JSONStreamParser(), json.dumps(DOCUMENTS[:3]).encode()[:-1], 10)
+
+
+def test_non_object_element():
+    with pytest.raises(IngestError, match="documento 1 no es un objeto"):
+        feed_in_chunks(JSONStreamParser(), b'[{"name": "a"}, 5, {"name": "b"}]', 4)
+
+
+def test_document_over_max_size():
+    parser = JSONStreamParser(max_document_size=100)
+    with pytest.raises(IngestError, match="documento 1"):
+        feed_in_chunks(parser, b'[{"name": "a"}, {"name": "' + b"x" * 500 + b'"}]', 10)
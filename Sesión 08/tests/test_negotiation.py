@@ -0,0 +1,45 @@
+"""
+Pruebas de la negociación con valores q de Accept (MessagePack) y Accept-Encoding (compresión)
+
+Ejecutar desde la carpeta de la sesión:
+    python -m pytest -q tests
+"""
+import pytest
+
+from app.v1.middleware.compression import negotiate_encoding
+from app.v1.utils.negotiation import parse_quality_values
+from app.v1.utils.responses import prefers_msgpack
+
+pytest.importorskip("msgpack")
+
+
+def test_parse_quality_values_reads_every_parameter():
+    assert parse_quality_values("application/msgpack;charset=x;q=0.5, Application/JSON; Q=0.2, */*") == {
+        "application/msgpack": 0.5, "application/json": 0.2, "*/*": 1.0,
+    }
+
+
+@pytest.mark.parametrize("accept", [
+    "application/msgpack;q=0",
+    "application/msgpack; Q=0",
+    "application/msgpack;charset=x;q=0",
+    "application/msgpack;q=0.5, application/json",
+    "application/json",
+    "",
+])
+def test_msgpack_refused_or_not_preferred(accept):
+    assert not prefers_msgpack(accept)
+
+
+@pytest.mark.parametrize("accept", [
+    "application/msgpack",
+    "application/msgpack;charset=x;q=0.9, application/json;q=0.5",
+    "application/x-msgpack, */*;q=0.1",
+])
+def test_msgpack_preferred(accept):
+    assert prefers_msgpack(accept)
+
+
+def test_encoding_refused_with_q_zero_after_other_parameters():
+    assert negotiate_encoding("gzip;level=1;Q=0") is None
+    assert negotiate_encoding("gzip;level=1;q=0.5, identity") == "gzip"
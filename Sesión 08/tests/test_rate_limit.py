@@ -0,0 +1,111 @@
+"""
+Pruebas de los almacenes de rate limit (app/v1/utils/rate_limit.py)
+
+RedisStore se prueba contra fakeredis (con lupa para ejecutar el script Lua), sin un servidor Redis.
+Instalar las dependencias de las pruebas y ejecutar desde la carpeta de la sesión:
+    pip install -r ../requirements-dev.txt
+    python -m pytest -q tests
+"""
+import asyncio
+
+import pytest
+
+from app.v1.utils.rate_limit import InMemoryStore, RateLimitStore, RedisStore
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_in_memory_bucket_refills_at_rate():
+    clock = FakeClock()
+    store = InMemoryStore(clock=clock)
+
+    async def run():
+        results = [await store.consume("k", 3, 1.0) for _ in range(4)]
+        assert [allowed for allowed, *_ in results] == [True, True, True, False]
+        assert results[-1][3] == pytest.approx(1.0)
+        clock.now += 1
+        assert (await store.consume("k", 3, 1.0))[0]
+
+    asyncio.run(run())
+
+
+# Llenar el almacén con buckets de una regla lenta no debe descartar el bucket a medio consumir de otra
+# regla (su cliente recibiría un bucket lleno), y el número de claves no debe superar max_keys
+def test_in_memory_eviction_keeps_drained_buckets_and_bounds_size():
+    clock = FakeClock()
+    store = InMemoryStore(max_keys=100, clock=clock)
+
+    async def run():
+        for _ in range(5):
+            await store.consume("login|ip:1", 5, 5 / 60)
+        for i in range(500):
+            clock.now += 0.01
+            await store.consume(f"fast|ip:{i}", 100, 1000.0)
+        assert len(store._buckets) <= 100
+        assert "login|ip:1" in store._buckets
+        assert not (await store.consume("login|ip:1", 5, 5 / 60))[0]
+
+    asyncio.run(run())
+
+
+# Por encima de max_keys se descarta el bucket que se llenaría primero
+def test_in_memory_evicts_bucket_closest_to_full():
+    store = InMemoryStore(max_keys=3, clock=FakeClock())
+
+    async def run():
+        for key, rate in (("b", 0.1), ("a", 1.0), ("c", 0.01), ("d", 0.001)):
+            await store.consume(key, 10, rate)
+        assert sorted(store._buckets) == ["b", "c", "d"]
+
+    asyncio.run(run())
+
+
+# Las entradas viejas del heap (un bucket consumido muchas veces) no crecen sin límite
+def test_in_memory_heap_is_compacted():
+    store = InMemoryStore(clock=FakeClock())
+
+    async def run():
+        for _ in range(5000):
+            await store.consume("hot", 10_000, 0.001)
+        assert len(store._buckets) == 1
+        assert len(store._full_at) <= 1026
+
+    asyncio.run(run())
+
+
+def test_store_interface_is_abstract():
+    with pytest.raises(TypeError):
+        RateLimitStore()
+
+
+@pytest.fixture
+def redis_store():
+    fakeredis = pytest.importorskip("fakeredis")
+    pytest.importorskip("lupa")
+    return RedisStore(fakeredis.FakeAsyncRedis())
+
+
+def test_redis_store_token_bucket(redis_store):
+    async def run():
+        results = [await redis_store.consume("k", 3, 0.5) for _ in range(4)]
+        assert [allowed for allowed, *_ in results] == [True, True, True, False]
+        assert [remaining for _, remaining, *_ in results] == [2, 1, 0, 0]
+        ttl = await redis_store.client.pttl("ratelimit:k")
+        assert 0 < ttl <= 7000
+
+    asyncio.run(run())
+
+
+# El script Lua es atómico: con muchas peticiones concurrentes no se permiten más que 'capacity'
+def test_redis_store_concurrent_consumes_are_atomic(redis_store):
+    async def run():
+        results = await asyncio.gather(*(redis_store.consume("shared", 20, 0.001) for _ in range(50)))
+        assert sum(allowed for allowed, *_ in results) == 20
+
+    asyncio.run(run())
@@ -0,0 +1,76 @@
+"""
+Pruebas de la agrupación de lecturas idénticas de GET /user/{id} (app/v1/utils/singleflight.py)
+
+La API se llama directamente (sin token ni BD): _render_user se reemplaza por una función que cuenta
+cuántas veces se ejecuta. Ejecutar desde la carpeta de la sesión:
+    python -m pytest -q tests
+"""
+import asyncio
+import threading
+import time
+import uuid
+
+import pytest
+
+from app.v1.routers import users
+from app.v1.utils import executors
+from app.v1.utils.singleflight import forget_user_reads
+
+
+@pytest.fixture
+def renders(monkeypatch):
+    calls = []
+    release = threading.Event()
+
+    def render(id, products_limit, fields):
+        calls.append(id)
+        number = len(calls)
+        release.wait(5)
+        return b'{"id": "%d"}' % number
+
+    monkeypatch.setattr(users, "_render_user", render)
+    # Los CapacityLimiter de anyio pertenecen al event loop de cada asyncio.run
+    monkeypatch.setattr(executors, "_limiters", {})
+    return calls, release
+
+
+def read(id):
+    return users.read_user(id, products_limit=None, fields=None)
+
+
+def test_concurrent_identical_reads_render_once(renders):
+    calls, release = renders
+    id = uuid.uuid4()
+
+    async def run():
+        reads = [asyncio.ensure_future(read(id)) for _ in range(20)]
+        await asyncio.sleep(0.05)
+        release.set()
+        return await asyncio.gather(*reads)
+
+    responses = asyncio.run(run())
+    assert len(calls) == 1
+    assert {response.body for response in responses} == {b'{"id": "1"}'}
+
+
+# Una escritura (desde un hilo del threadpool, como update_user) hace que las lecturas siguientes no se
+# unan a la que ya estaba en curso, que pudo leer el usuario antes del cambio
+def test_write_invalidates_read_in_flight(renders):
+    calls, release = renders
+    id = uuid.uuid4()
+
+    async def run():
+        before = asyncio.ensure_future(read(id))
+        await asyncio.sleep(0.05)
+        await asyncio.to_thread(forget_user_reads, id)
+        after = [asyncio.ensure_future(read(id)) for _ in range(5)]
+        deadline = time.monotonic() + 2
+        while len(calls) < 2 and time.monotonic() < deadline:
+            await asyncio.sleep(0.01)
+        release.set()
+        return await before, await asyncio.gather(*after)
+
+    before, after = asyncio.run(run())
+    assert len(calls) == 2
+    assert before.body == b'{"id": "1"}'
+    assert {response.body for response in after} == {b'{"id": "2"}'}